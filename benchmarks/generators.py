@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from mfow_compfin.yield_curve import YieldCurve
+
+
+# seeded synthetic data for the benchmarks. the same (size, seed) always gives the same data.
+
+def make_yield_curve(**kwargs) -> YieldCurve:
+    # an upward sloping monthly curve with `knots` knots up to `horizon` periods.
+    knots: int = kwargs.get('knots', 20)
+    horizon: int = kwargs.get('horizon', 360)
+    rng = np.random.default_rng(kwargs.get('seed', 0))
+
+    periods = np.unique(np.linspace(1, horizon, knots).astype(np.int64))
+    rates = 0.02 + 0.03 * (1.0 - np.exp(-periods / 120.0)) + rng.normal(0.0, 0.001, len(periods))
+
+    return YieldCurve(periods=periods, rates=rates, periods_per_year=12,
+                      allow_prior_extrapolation=True, allow_post_extrapolation=True,
+                      discount_grid_horizon=kwargs.get('discount_grid_horizon'))
+
+
+def make_cashflow_book(**kwargs) -> np.ndarray:
+    # (loans x periods) level payments of amortising loans with random principal, rate and term.
+    loans: int = kwargs.get('loans', 1000)
+    max_term: int = kwargs.get('max_term', 360)
+    rng = np.random.default_rng(kwargs.get('seed', 0))
+
+    principal = rng.lognormal(np.log(200000.0), 0.5, loans)
+    monthly_rate = rng.uniform(0.02, 0.08, loans) / 12.0
+    term = rng.integers(12, max_term + 1, loans)
+
+    payment = principal * monthly_rate / (1.0 - (1.0 + monthly_rate) ** -term)
+    periods = np.arange(1, max_term + 1)
+
+    return np.where(periods[np.newaxis, :] <= term[:, np.newaxis], payment[:, np.newaxis], 0.0)
+
+
+def make_returns(**kwargs) -> np.ndarray:
+    # fat tailed (log students t) returns with occasional total losses of -1.
+    n: int = kwargs.get('n', 1000)
+    rng = np.random.default_rng(kwargs.get('seed', 0))
+
+    returns = np.exp(0.005 + 0.04 * rng.standard_t(kwargs.get('df', 3.0), n)) - 1.0
+    returns[rng.random(n) < kwargs.get('total_loss_rate', 0.01)] = -1.0
+
+    return returns
+
+
+def make_applications(**kwargs) -> pd.DataFrame:
+    # credit applications with continuous and categorical predictors, missing values and a default flag.
+    rows: int = kwargs.get('rows', 10000)
+    continuous: int = kwargs.get('continuous', 6)
+    categorical: int = kwargs.get('categorical', 4)
+    missing_rate: float = kwargs.get('missing_rate', 0.01)
+    rng = np.random.default_rng(kwargs.get('seed', 0))
+
+    columns = dict()
+    logit = np.full(rows, -2.0)
+
+    for i in range(continuous):
+        values = rng.normal(0.0, 1.0, rows)
+        logit += rng.normal(0.0, 0.3) * values
+        columns['x{}'.format(i)] = values
+
+    for i in range(categorical):
+        levels = np.array(['c{}'.format(j) for j in range(3 + i)], dtype=object)
+        codes = rng.integers(0, len(levels), rows)
+        logit += rng.normal(0.0, 0.3, len(levels))[codes]
+        columns['cat{}'.format(i)] = levels[codes]
+
+    columns['default'] = (rng.random(rows) < 1.0 / (1.0 + np.exp(-logit))).astype(int)
+    data = pd.DataFrame(columns)
+
+    for i in range(continuous):
+        data.loc[rng.random(rows) < missing_rate, 'x{}'.format(i)] = np.nan
+
+    return data
@@ -0,0 +1,157 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+import scipy
+import pandas as pd
+import sklearn
+from typing import Dict, List, Optional
+from .suite import BENCHMARKS, setup_benchmark
+
+
+# runs the benchmarks, saves the timings and peak memory as json and compares them against a baseline:
+#
+#   python -m benchmarks.run --scale small --output results.json
+#   python -m benchmarks.run --scale small --baseline results.json --time-threshold 0.25
+#
+# the exit status is 1 when any benchmark is slower (or uses more memory) than the baseline
+# by more than the threshold.
+
+
+def run_benchmark(name: str, size: int, **kwargs) -> dict:
+    repeat: int = kwargs.get('repeat', 5)
+    seed: int = kwargs.get('seed', 0)
+
+    function, rows = setup_benchmark(name, size, seed)
+
+    # warm up (imports, caches), then time, then measure memory on a separate call
+    # as tracing slows the code down.
+    function()
+
+    seconds: List[float] = list()
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = float(np.median(seconds))
+
+    return {
+        'name': name,
+        'size': size,
+        'rows': rows,
+        'repeat': repeat,
+        'min_seconds': float(np.min(seconds)),
+        'median_seconds': median,
+        'rows_per_second': rows / median if median > 0 else np.inf,
+        'peak_memory_bytes': int(peak_memory)
+    }
+
+
+def run_suite(**kwargs) -> dict:
+    scale: str = kwargs.get('scale', 'small')
+    names: Optional[List[str]] = kwargs.get('names')
+    log = kwargs.get('log', print)
+
+    results: Dict[str, dict] = dict()
+
+    for name, (_, sizes) in BENCHMARKS.items():
+        if names is not None and not any(pattern in name for pattern in names):
+            continue
+
+        for size in sizes[scale]:
+            result = run_benchmark(name, size, **kwargs)
+            key = '{}[{}]'.format(name, size)
+            results[key] = result
+            log('{:<50} {:>10.6f} s {:>12.0f} rows/s {:>10.1f} MiB'.format(
+                key, result['median_seconds'], result['rows_per_second'], result['peak_memory_bytes'] / 2 ** 20))
+
+    return {
+        'meta': {
+            'scale': scale,
+            'seed': kwargs.get('seed', 0),
+            'repeat': kwargs.get('repeat', 5),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(results: dict, baseline: dict, **kwargs) -> List[dict]:
+    # benchmarks present in both runs whose median time or peak memory grew by more than the threshold.
+    time_threshold: float = kwargs.get('time_threshold', 0.2)
+    memory_threshold: float = kwargs.get('memory_threshold', 0.2)
+
+    regressions: List[dict] = list()
+
+    for key, result in results['results'].items():
+        if key not in baseline['results']:
+            continue
+
+        base = baseline['results'][key]
+        checks = [('median_seconds', time_threshold), ('peak_memory_bytes', memory_threshold)]
+
+        for metric, threshold in checks:
+            if base[metric] > 0 and result[metric] > base[metric] * (1.0 + threshold):
+                regressions.append({
+                    'benchmark': key,
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'ratio': result[metric] / base[metric]
+                })
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run the mfow_compfin benchmarks.')
+    parser.add_argument('--scale', choices=['small', 'large'], default='small')
+    parser.add_argument('--filter', nargs='*', default=None, help='only benchmarks whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='json file to write the results to')
+    parser.add_argument('--baseline', default=None, help='json results to compare against')
+    parser.add_argument('--time-threshold', type=float, default=0.2)
+    parser.add_argument('--memory-threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_suite(scale=args.scale, names=args.filter, repeat=args.repeat, seed=args.seed)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    regressions = compare(results, baseline, time_threshold=args.time_threshold,
+                          memory_threshold=args.memory_threshold)
+
+    for regression in regressions:
+        print('REGRESSION {benchmark} {metric}: {baseline:.6g} -> {current:.6g} ({ratio:.2f}x)'.format(**regression))
+
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import warnings
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from mfow_compfin.risk.portfolio_risk import sharpe_ratio
+from mfow_compfin.risk.portfolio_risk.distributions import fit_distribution
+from mfow_compfin.risk.consumer_credit import CreditScoreCard, screen_predictors
+from .generators import make_yield_curve, make_cashflow_book, make_returns, make_applications
+
+
+# every benchmark takes a size and a seed and returns (function to time, rows processed per call).
+# setup (data generation, fitting prerequisites) is not timed.
+
+def yield_curve_get_rate(size: int, seed: int) -> Tuple[Callable, int]:
+    curve = make_yield_curve(knots=40, seed=seed)
+    periods = np.random.default_rng(seed).integers(0, 480, size)
+    return lambda: curve.get_rate(periods), size
+
+
+def yield_curve_discount(size: int, seed: int) -> Tuple[Callable, int]:
+    curve = make_yield_curve(knots=40, seed=seed)
+    periods = np.random.default_rng(seed).integers(0, 480, size)
+    return lambda: curve.discount(periods), size
+
+
+def yield_curve_npv(size: int, seed: int) -> Tuple[Callable, int]:
+    # one npv call per loan, as code valuing instruments one at a time does.
+    curve = make_yield_curve(knots=40, seed=seed)
+    book = make_cashflow_book(loans=size, seed=seed)
+    loans = [(cashflows[cashflows != 0.0].tolist(), (np.flatnonzero(cashflows) + 1).tolist()) for cashflows in book]
+    return lambda: [curve.npv(cashflows=cashflows, timestamps=timestamps) for cashflows, timestamps in loans], size
+
+
+def yield_curve_npv_batch(size: int, seed: int) -> Tuple[Callable, int]:
+    curve = make_yield_curve(knots=40, seed=seed)
+    book = make_cashflow_book(loans=size, seed=seed)
+    return lambda: curve.npv_batch(cashflows=book, timestamps=np.arange(1, book.shape[1] + 1)), size
+
+
+def distribution_fit(size: int, seed: int) -> Tuple[Callable, int]:
+    returns = make_returns(n=size, seed=seed)
+    return lambda: fit_distribution(returns), size
+
+
+def distribution_cvar(size: int, seed: int) -> Tuple[Callable, int]:
+    distribution = fit_distribution(make_returns(n=1000, seed=seed))
+    p = np.linspace(0.001, 0.2, size)
+    return lambda: distribution.conditional_value_at_risk(p), size
+
+
+def portfolio_sharpe_ratio(size: int, seed: int) -> Tuple[Callable, int]:
+    returns = np.stack([make_returns(n=size, seed=seed + i) for i in range(50)], axis=1)
+    return lambda: sharpe_ratio(asset_returns=returns, risk_free_return=0.001), size * 50
+
+
+def __fitted_scorecard(size: int, seed: int):
+    data = make_applications(rows=size, seed=seed)
+    scorecard = CreditScoreCard(data=data, response='default')
+    scorecard.train_categories()
+    return data, scorecard
+
+
+def scorecard_preprocess(size: int, seed: int) -> Tuple[Callable, int]:
+    data, scorecard = __fitted_scorecard(size, seed)
+    return lambda: scorecard.preprocess(), len(scorecard.data)
+
+
+def scorecard_fit(size: int, seed: int) -> Tuple[Callable, int]:
+    data, scorecard = __fitted_scorecard(size, seed)
+    return lambda: scorecard.fit(), len(scorecard.data)
+
+
+def scorecard_prob_default(size: int, seed: int) -> Tuple[Callable, int]:
+    data, scorecard = __fitted_scorecard(size, seed)
+    scorecard.fit()
+    return lambda: scorecard.prob_default(), len(scorecard.data)
+
+
+def credit_screen_predictors(size: int, seed: int) -> Tuple[Callable, int]:
+    data = make_applications(rows=size, seed=seed)
+    return lambda: screen_predictors(data, response='default'), size
+
+
+def __quiet(function: Callable) -> Callable:
+    def run():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return function()
+    return run
+
+
+# name -> (setup, sizes by scale)
+BENCHMARKS: Dict[str, Tuple[Callable, Dict[str, List[int]]]] = {
+    'yield_curve.get_rate': (yield_curve_get_rate, {'small': [1000], 'large': [10000, 1000000]}),
+    'yield_curve.discount': (yield_curve_discount, {'small': [1000], 'large': [10000, 1000000]}),
+    'yield_curve.npv': (yield_curve_npv, {'small': [100], 'large': [1000, 10000]}),
+    'yield_curve.npv_batch': (yield_curve_npv_batch, {'small': [100], 'large': [1000, 20000]}),
+    'distributions.fit_distribution': (distribution_fit, {'small': [250], 'large': [1000, 10000]}),
+    'distributions.conditional_value_at_risk': (distribution_cvar, {'small': [10], 'large': [100, 10000]}),
+    'portfolio.sharpe_ratio': (portfolio_sharpe_ratio, {'small': [250], 'large': [2500, 25000]}),
+    'scorecard.preprocess': (scorecard_preprocess, {'small': [2000], 'large': [20000, 200000]}),
+    'scorecard.fit': (scorecard_fit, {'small': [2000], 'large': [20000, 200000]}),
+    'scorecard.prob_default': (scorecard_prob_default, {'small': [2000], 'large': [20000, 200000]}),
+    'scorecard.screen_predictors': (credit_screen_predictors, {'small': [2000], 'large': [20000, 100000]})
+}
+
+
+def setup_benchmark(name: str, size: int, seed: int) -> Tuple[Callable, int]:
+    setup, _ = BENCHMARKS[name]
+    function, rows = __quiet(lambda: setup(size, seed))()
+    return __quiet(function), rows
@@ -0,0 +1,6 @@
+from .stats import StatsRegistry, enabled, enable, disable, record, count, call_timed, instrumented, profile, \
+    snapshot, reset, to_json, to_prometheus
+
+
+__all__ = ['StatsRegistry', 'enabled', 'enable', 'disable', 'record', 'count', 'call_timed', 'instrumented', 'profile',
+           'snapshot', 'reset', 'to_json', 'to_prometheus']
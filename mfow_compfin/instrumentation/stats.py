@@ -0,0 +1,258 @@
+import json
+import time
+import random
+import threading
+import functools
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+
+class StatsRegistry:
+    # call counts, timings, rows processed and named counters per instrumented function.
+    # timings keep a uniform sample (reservoir) of at most max_samples calls for the percentiles.
+    def __init__(self, **kwargs):
+        self.max_samples: int = kwargs.get('max_samples', 10000)
+        assert self.max_samples >= 1
+
+        self.__lock = threading.Lock()
+        self.__random = random.Random(0)
+        self.__stats: Dict[str, dict] = dict()
+
+    def __entry(self, name: str) -> dict:
+        entry = self.__stats.get(name)
+        if entry is None:
+            entry = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'samples': list(), 'counters': dict()}
+            self.__stats[name] = entry
+        return entry
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None):
+        with self.__lock:
+            entry = self.__entry(name)
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            if rows is not None:
+                entry['rows'] += int(rows)
+
+            samples = entry['samples']
+            if len(samples) < self.max_samples:
+                samples.append(seconds)
+            else:
+                j = self.__random.randrange(entry['calls'])
+                if j < self.max_samples:
+                    samples[j] = seconds
+
+    def count(self, name: str, **counters):
+        with self.__lock:
+            entry_counters = self.__entry(name)['counters']
+            for key, value in counters.items():
+                entry_counters[key] = entry_counters.get(key, 0) + value
+
+    def reset(self):
+        with self.__lock:
+            self.__stats.clear()
+
+    def snapshot(self) -> Dict[str, dict]:
+        # statistics that are undefined (e.g. percentiles of an entry with counters only) are None,
+        # so the snapshot serialises to valid json.
+        result = dict()
+
+        with self.__lock:
+            for name, entry in self.__stats.items():
+                calls = entry['calls']
+                samples = np.array(entry['samples'])
+                percentiles = np.percentile(samples, [50, 90, 99]).tolist() if len(samples) > 0 else [None] * 3
+
+                stats = {
+                    'calls': calls,
+                    'total_seconds': entry['seconds'],
+                    'mean_seconds': entry['seconds'] / calls if calls > 0 else None,
+                    'p50_seconds': percentiles[0],
+                    'p90_seconds': percentiles[1],
+                    'p99_seconds': percentiles[2],
+                    'max_seconds': entry['max_seconds'],
+                    'rows': entry['rows'],
+                    'rows_per_second': entry['rows'] / entry['seconds'] if entry['seconds'] > 0 else None
+                }
+
+                counters = dict(entry['counters'])
+                # caches count hits and misses, from which the hit rate follows.
+                if 'hits' in counters or 'misses' in counters:
+                    lookups = counters.get('hits', 0) + counters.get('misses', 0)
+                    counters['hit_rate'] = counters.get('hits', 0) / lookups if lookups > 0 else None
+
+                stats['counters'] = counters
+                result[name] = stats
+
+        return result
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), allow_nan=False, **kwargs)
+
+    def to_prometheus(self, prefix: str = 'mfow_compfin') -> str:
+        # prometheus text exposition format, one metric family per statistic with the function as label.
+        lines: List[str] = list()
+        snapshot = self.snapshot()
+
+        def family(metric: str, metric_type: str, help_text: str):
+            lines.append('# HELP {}_{} {}'.format(prefix, metric, help_text))
+            lines.append('# TYPE {}_{} {}'.format(prefix, metric, metric_type))
+
+        def sample(metric: str, labels: dict, value):
+            label_text = ','.join('{}="{}"'.format(key, str(label).replace('"', '\\"'))
+                                  for key, label in labels.items())
+            if value is None:
+                value_text = 'NaN'
+            elif isinstance(value, (int, np.integer)):
+                value_text = str(int(value))
+            else:
+                value_text = 'NaN' if np.isnan(value) else repr(float(value))
+            lines.append('{}_{}{{{}}} {}'.format(prefix, metric, label_text, value_text))
+
+        # functions with counters only (e.g. caches) have no timings.
+        timed = {name: stats for name, stats in snapshot.items() if stats['calls'] > 0}
+
+        family('calls_total', 'counter', 'Number of calls.')
+        for name, stats in timed.items():
+            sample('calls_total', {'function': name}, stats['calls'])
+
+        family('seconds', 'summary', 'Time spent per call.')
+        for name, stats in timed.items():
+            for quantile in ['0.5', '0.9', '0.99']:
+                key = 'p{}_seconds'.format(quantile[2:].ljust(2, '0'))
+                sample('seconds', {'function': name, 'quantile': quantile}, stats[key])
+            sample('seconds_sum', {'function': name}, stats['total_seconds'])
+            sample('seconds_count', {'function': name}, stats['calls'])
+
+        family('rows_total', 'counter', 'Number of rows processed.')
+        for name, stats in timed.items():
+            sample('rows_total', {'function': name}, stats['rows'])
+
+        family('counter', 'gauge', 'Named counters (cache hits, optimizer iterations, ...).')
+        for name, stats in snapshot.items():
+            for key, value in stats['counters'].items():
+                sample('counter', {'function': name, 'counter': key}, value)
+
+        return '\n'.join(lines) + '\n'
+
+
+# registries currently collecting. nothing is recorded while the list is empty, which is the default.
+_active: List[StatsRegistry] = list()
+_default = StatsRegistry()
+
+# whether any registry is collecting. hot paths check this flag inline (rather than calling into this module),
+# so disabled instrumentation costs a single global lookup.
+_enabled: bool = False
+
+
+def _activate(registry: StatsRegistry):
+    global _enabled
+    _active.append(registry)
+    _enabled = True
+
+
+def _deactivate(registry: StatsRegistry):
+    global _enabled
+    _active.remove(registry)
+    _enabled = len(_active) > 0
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    # start collecting into the default registry.
+    if _default not in _active:
+        _activate(_default)
+
+
+def disable():
+    if _default in _active:
+        _deactivate(_default)
+
+
+def record(name: str, seconds: float, rows: Optional[int] = None):
+    if not _enabled:
+        return
+
+    for registry in _active:
+        registry.record(name, seconds, rows)
+
+
+def count(name: str, **counters):
+    if not _enabled:
+        return
+
+    for registry in _active:
+        registry.count(name, **counters)
+
+
+def call_timed(name: str, rows: Optional[Callable], function: Callable, args: tuple, kwargs: dict):
+    # function(*args, **kwargs), with its time and rows recorded under name. hot paths that are too cheap for a
+    # wrapper check _enabled inline and only then call through here.
+    # rows(result, *args, **kwargs) gives the number of rows processed by a call. a rows function that fails
+    # only leaves the rows of that call unrecorded, it never fails the call itself.
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start_time
+
+    processed = None
+    if rows is not None:
+        try:
+            processed = rows(result, *args, **kwargs)
+        except Exception:
+            pass
+
+    record(name, seconds, processed)
+    return result
+
+
+def instrumented(name: str, rows: Optional[Callable] = None) -> Callable:
+    # times every call of the decorated function while instrumentation is enabled, see call_timed.
+    # when disabled the wrapper only checks the enabled flag.
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            return call_timed(name, rows, function, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class profile:
+    # collects into a fresh registry for the duration of a with block:
+    #
+    #   with profile() as stats:
+    #       curve.npv(...)
+    #   print(stats.to_prometheus())
+    def __init__(self, **kwargs):
+        self.registry = StatsRegistry(**kwargs)
+
+    def __enter__(self) -> StatsRegistry:
+        _activate(self.registry)
+        return self.registry
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _deactivate(self.registry)
+        return False
+
+
+def snapshot() -> Dict[str, dict]:
+    return _default.snapshot()
+
+
+def reset():
+    _default.reset()
+
+
+def to_json(**kwargs) -> str:
+    return _default.to_json(**kwargs)
+
+
+def to_prometheus(prefix: str = 'mfow_compfin') -> str:
+    return _default.to_prometheus(prefix)
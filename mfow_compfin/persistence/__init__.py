@@ -0,0 +1,4 @@
+from .artifact import save_artifact, load_artifact
+
+
+__all__ = ['save_artifact', 'load_artifact']
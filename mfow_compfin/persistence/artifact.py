@@ -0,0 +1,88 @@
+import json
+import struct
+import numpy as np
+from typing import Dict, Optional
+
+
+# file layout: magic, little-endian uint64 header length, JSON header, then each array's raw bytes
+# at an aligned offset, so arrays can be memory mapped read-only and shared between processes.
+MAGIC = b'MFOWCF01'
+ALIGNMENT = 64
+
+
+def __aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_artifact(path: str, **kwargs):
+    kind: str = kwargs.get('kind')
+    meta: dict = kwargs.get('meta', dict())
+    arrays: Dict[str, np.ndarray] = kwargs.get('arrays', dict())
+
+    assert isinstance(kind, str)
+
+    descriptors = dict()
+    contiguous = dict()
+    offset = 0
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise RuntimeError('Cannot save object array ' + name + '.')
+
+        offset = __aligned(offset)
+        descriptors[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset
+        }
+        contiguous[name] = array
+        offset += array.nbytes
+
+    header = json.dumps({'kind': kind, 'meta': meta, 'arrays': descriptors}).encode('utf-8')
+    data_start = __aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+
+        for name, array in contiguous.items():
+            f.write(b'\0' * (data_start + descriptors[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+
+
+def load_artifact(path: str, **kwargs) -> dict:
+    # mmap=True maps the arrays read-only instead of reading them into memory.
+    mmap: bool = kwargs.get('mmap', True)
+    kind: Optional[str] = kwargs.get('kind')
+
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise RuntimeError('Not a saved artifact: ' + str(path))
+
+        header_length = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    if kind is not None and header['kind'] != kind:
+        raise RuntimeError('Expected a saved ' + kind + ' but found ' + header['kind'] + '.')
+
+    data_start = __aligned(len(MAGIC) + 8 + header_length)
+
+    arrays = dict()
+    for name, descriptor in header['arrays'].items():
+        dtype = np.dtype(descriptor['dtype'])
+        shape = tuple(descriptor['shape'])
+        offset = data_start + descriptor['offset']
+
+        if mmap and int(np.prod(shape)) > 0:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        else:
+            count = int(np.prod(shape))
+            arrays[name] = np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    return {
+        'kind': header['kind'],
+        'meta': header['meta'],
+        'arrays': arrays
+    }
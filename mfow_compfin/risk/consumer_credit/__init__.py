@@ -1,7 +1,15 @@
 from .column_types import CreditScoreCardColumnType
 from .scorecard import CreditScoreCard
+from .compiled_scorecard import CompiledScoreCard
 from .screen_predictors import screen_predictors
+from .histogram_screen import HistogramScreen
+from .binning import fit_bins, apply_bins
+from .schema import ColumnSchema, infer_schema
+from .model_metrics import ModelMetricsAccumulator
+from .cross_validation import grid_search
+from .expected_loss import iter_expected_loss, expected_loss_summary
 
 
-__all__ = ['CreditScoreCard', 'CreditScoreCardColumnType', 'screen_predictors']
-
+__all__ = ['CreditScoreCard', 'CompiledScoreCard', 'CreditScoreCardColumnType', 'screen_predictors',
+           'HistogramScreen', 'fit_bins', 'apply_bins', 'ColumnSchema', 'infer_schema', 'iter_expected_loss',
+           'expected_loss_summary', 'ModelMetricsAccumulator', 'grid_search']
@@ -0,0 +1,129 @@
+import numpy as np
+from typing import List
+
+
+def apply_bins(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # the bin of each value, 0 .. len(edges), where bin j covers [edges[j - 1], edges[j]).
+    # missing values have no bin: they are dropped when bins are learnt, so there is no contribution for them.
+    values = np.asarray(values, dtype=float)
+    if np.any(np.isnan(values)):
+        raise ValueError('Found {} missing values, which have no bin'.format(int(np.sum(np.isnan(values)))))
+
+    return np.searchsorted(edges, values, side='right')
+
+
+def __bin_counts(edges: np.ndarray, x: np.ndarray, y: np.ndarray):
+    codes = apply_bins(edges, x)
+    counts = np.bincount(codes, minlength=len(edges) + 1).astype(float)
+    events = np.bincount(codes, weights=y, minlength=len(edges) + 1)
+    return counts, events
+
+
+def __event_rate(events: float, count: float) -> float:
+    return events / count if count > 0 else 0.0
+
+
+def __drop_empty_bins(edges: List[float], counts: List[float], events: List[float]):
+    # an empty bin is removed by dropping one of its edges, which merges it into a neighbour.
+    j = 0
+    while j < len(counts) and len(counts) > 1:
+        if counts[j] > 0:
+            j += 1
+            continue
+
+        del counts[j]
+        del events[j]
+        del edges[max(j - 1, 0)]
+
+
+def __merge_small_bins(edges: List[float], counts: List[float], events: List[float], min_count: float):
+    # repeatedly merge the smallest bin into the neighbour with the closer event rate.
+    while len(counts) > 1:
+        j = int(np.argmin(counts))
+        if counts[j] >= min_count:
+            break
+
+        if j == 0:
+            k = 1
+        elif j == len(counts) - 1:
+            k = j - 1
+        else:
+            rate = __event_rate(events[j], counts[j])
+            left = abs(__event_rate(events[j - 1], counts[j - 1]) - rate)
+            right = abs(__event_rate(events[j + 1], counts[j + 1]) - rate)
+            k = j - 1 if left <= right else j + 1
+
+        lower = min(j, k)
+        counts[lower] += counts[lower + 1]
+        events[lower] += events[lower + 1]
+        del counts[lower + 1]
+        del events[lower + 1]
+        del edges[lower]
+
+
+def __merge_monotone(edges: List[float], counts: List[float], events: List[float], increasing: bool):
+    # pool adjacent violators: merge neighbouring bins until the event rate is monotone.
+    sign = 1.0 if increasing else -1.0
+
+    j = 0
+    while j < len(counts) - 1:
+        if sign * (__event_rate(events[j + 1], counts[j + 1]) - __event_rate(events[j], counts[j])) > 0.0:
+            j += 1
+            continue
+
+        counts[j] += counts[j + 1]
+        events[j] += events[j + 1]
+        del counts[j + 1]
+        del events[j + 1]
+        del edges[j]
+
+        # the merged bin may now violate the order with the bin before it.
+        if j > 0:
+            j -= 1
+
+
+def fit_bins(x: np.ndarray, y: np.ndarray, **kwargs) -> np.ndarray:
+    # learns cut points for a continuous predictor x against a binary response y:
+    # quantile pre-binning, then merging of small bins, then merging of adjacent bins until the
+    # event rate (and so the weight of evidence) is monotone in x.
+    max_bins: int = kwargs.get('max_bins', 20)
+    min_bin_fraction: float = kwargs.get('min_bin_fraction', 0.05)
+    monotone: bool = kwargs.get('monotone', True)
+
+    assert max_bins >= 2
+    assert 0.0 <= min_bin_fraction < 1.0
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    assert x.shape == y.shape
+
+    present = np.logical_not(np.isnan(x) | np.isnan(y))
+    x = x[present]
+    y = y[present]
+
+    if len(x) == 0:
+        return np.zeros(0)
+
+    # cut points are observed values (the lower order statistic at each quantile), so with ties
+    # no cut point falls strictly between two neighbouring values and leaves a bin empty.
+    quantiles = np.linspace(0.0, 1.0, max_bins + 1)[1:-1]
+    sorted_x = np.sort(x)
+    edges = np.unique(sorted_x[np.floor(quantiles * (len(x) - 1)).astype(np.int64)])
+    # an edge at the minimum would leave the first bin empty.
+    edges = edges[edges > sorted_x[0]]
+
+    counts, events = __bin_counts(edges, x, y)
+
+    edges = edges.tolist()
+    counts = counts.tolist()
+    events = events.tolist()
+
+    __drop_empty_bins(edges, counts, events)
+    __merge_small_bins(edges, counts, events, min_bin_fraction * len(x))
+
+    if monotone and len(counts) > 1:
+        # the direction of the trend is taken from the correlation of x and y.
+        increasing = bool(np.sum((x - np.mean(x)) * (y - np.mean(y))) >= 0.0)
+        __merge_monotone(edges, counts, events, increasing)
+
+    return np.array(edges, dtype=float)
@@ -0,0 +1,92 @@
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from typing import Dict, List
+from .column_types import CreditScoreCardColumnType
+from .binning import apply_bins
+
+
+# a fitted scorecard reduced to lookup tables: the intercept, a coefficient per continuous predictor,
+# a contribution per category of each categorical predictor and a contribution per bin of each binned predictor.
+# terms are summed in design matrix column order, as the logistic regression does,
+# so probabilities match CreditScoreCard.prob_default.
+class CompiledScoreCard:
+    def __init__(self, **kwargs):
+        self.predictors: List[str] = kwargs.get('predictors')
+        self.data_types: List[CreditScoreCardColumnType] = kwargs.get('data_types')
+        self.intercept: float = float(kwargs.get('intercept'))
+        self.coefficients: Dict[str, float] = kwargs.get('coefficients', dict())
+        self.categories: Dict[str, np.ndarray] = kwargs.get('categories', dict())
+        self.bin_edges: Dict[str, np.ndarray] = kwargs.get('bin_edges', dict())
+        self.contributions: Dict[str, np.ndarray] = kwargs.get('contributions', dict())
+
+        assert len(self.predictors) == len(self.data_types)
+
+        # per predictor (name, coefficient, category -> contribution, bin edges) for scoring single rows.
+        self.__row_terms = list()
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            if self.data_types[i] is CreditScoreCardColumnType.CONTINUOUS:
+                self.__row_terms.append((predictor, float(self.coefficients[predictor]), None, None))
+            elif self.data_types[i] is CreditScoreCardColumnType.BIN:
+                self.__row_terms.append((predictor, None, self.contributions[predictor].tolist(),
+                                         self.bin_edges[predictor].tolist()))
+            else:
+                lookup = dict(zip(self.categories[predictor].tolist(), self.contributions[predictor].tolist()))
+                self.__row_terms.append((predictor, None, lookup, None))
+
+    def __category_codes(self, predictor: str, values: pd.Series) -> np.ndarray:
+        codes = pd.Categorical(values, categories=self.categories[predictor]).codes
+
+        if np.any(codes < 0):
+            unknown = pd.unique(np.asarray(values)[codes < 0])
+            raise ValueError('Found unknown categories {} in column {}'.format(list(unknown[:10]), predictor))
+
+        return codes
+
+    def score(self, data: pd.DataFrame) -> np.ndarray:
+        # log odds of default for every row
+        assert isinstance(data, pd.DataFrame)
+
+        result = np.zeros(len(data))
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+
+            if self.data_types[i] is CreditScoreCardColumnType.CONTINUOUS:
+                result += data[predictor].to_numpy(dtype=float) * self.coefficients[predictor]
+            elif self.data_types[i] is CreditScoreCardColumnType.BIN:
+                bins = apply_bins(self.bin_edges[predictor], data[predictor].to_numpy(dtype=float))
+                result += self.contributions[predictor][bins]
+            else:
+                result += self.contributions[predictor][self.__category_codes(predictor, data[predictor])]
+
+        result += self.intercept
+        return result
+
+    def prob_default(self, data: pd.DataFrame) -> np.ndarray:
+        return expit(self.score(data))
+
+    def score_row(self, row: dict) -> float:
+        result = 0.0
+
+        for predictor, coefficient, lookup, edges in self.__row_terms:
+            value = row[predictor]
+            if lookup is None:
+                result += float(value) * coefficient
+            elif edges is not None:
+                value = float(value)
+                if np.isnan(value):
+                    raise ValueError('Found missing value in binned column {}'.format(predictor))
+                result += lookup[bisect_right(edges, value)]
+            else:
+                try:
+                    result += lookup[value]
+                except KeyError:
+                    raise ValueError('Found unknown category {} in column {}'.format(value, predictor))
+
+        return result + self.intercept
+
+    def prob_default_row(self, row: dict) -> float:
+        return float(expit(self.score_row(row)))
@@ -1,57 +1,53 @@
 import pandas as pd
-import numpy as np
-from typing import List
+from typing import List, Optional
 from .column_types import CreditScoreCardColumnType
+from .schema import ColumnSchema, infer_schema
+from .data_source import check_rereadable
 
 
 def internal_process_columns(**kwargs):
-    data: pd.DataFrame = kwargs.get('data')
-    assert isinstance(data, pd.DataFrame)
+    data: Optional[pd.DataFrame] = kwargs.get('data')
 
-    predictors: List[str] = kwargs.get('predictors')
-    response: str = kwargs.get('response')
+    # a schema from an earlier inference skips inference, and then no data is needed.
+    schema: Optional[ColumnSchema] = kwargs.get('schema')
 
-    data_columns = list(data)
+    # data too large for memory is given as source (an iterable of DataFrames or a CSV / Parquet path),
+    # from which the schema is inferred in a streaming pass.
+    source = kwargs.get('source')
 
-    if isinstance(response, int):
-        response = data_columns[response]
+    if schema is None:
+        options = {key: value for key, value in kwargs.items() if key not in ['data', 'source']}
 
-    if predictors is None:
-        predictors = list(data)
-        predictors.remove(response)
+        if source is not None and data is None:
+            # inference may stop after the first chunks, which an iterator would then no longer have for training.
+            check_rereadable(source)
+            schema = infer_schema(source, **options)
+        else:
+            assert isinstance(data, pd.DataFrame)
+            schema = infer_schema(data, **options)
+    else:
+        assert data is None or isinstance(data, pd.DataFrame)
 
-    id_var: str = kwargs.get('id_var')
-    if id_var is not None:
-        if id_var in predictors:
-            predictors.remove(id_var)
+    response: str = schema.response
+    predictors: List[str] = list(schema.predictors)
+    data_types: List[CreditScoreCardColumnType] = list(schema.column_types)
 
     assert response not in predictors
 
-    for predictor in predictors:
-        assert predictor in data_columns
-
-    data_types: List[CreditScoreCardColumnType] = list()
-
-    for predictor in predictors:
-        predictor_series = data[predictor]
-        if predictor_series.dtype in ['str', 'object']:
-            data_type = CreditScoreCardColumnType.CATEGORICAL
-        else:
-            num_values = len(np.unique(predictor_series))
-
-            if num_values > 10:
-                data_type = CreditScoreCardColumnType.CONTINUOUS
-            else:
-                data_type = CreditScoreCardColumnType.CATEGORICAL
+    if data is not None:
+        columns = [*predictors, response]
 
-        data_types.append(data_type)
+        for column in columns:
+            assert column in data
 
-    if data is not None:
-        data = data[[*predictors, response]].dropna()
+        # rows with missing values are dropped, which needs a copy only if there are any.
+        if any(data[column].hasnans for column in columns):
+            data = data[columns].dropna()
 
     return {
         'data': data,
         'response': response,
         'predictors': predictors,
-        'column_types': data_types
+        'column_types': data_types,
+        'schema': schema
     }
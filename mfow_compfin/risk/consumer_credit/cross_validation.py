@@ -0,0 +1,123 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.preprocessing import OneHotEncoder
+from typing import List, Optional, Tuple
+from .scorecard import CreditScoreCard
+from .schema import ColumnSchema, infer_schema
+from .model_metrics import get_model_metrics
+
+
+def _fold_indices(data: pd.DataFrame, **kwargs) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # (training rows, validation rows) per fold.
+    folds: int = kwargs.get('folds', 5)
+    split: str = kwargs.get('split', 'kfold')
+    assert folds >= 2
+
+    if split == 'kfold':
+        order = np.random.default_rng(kwargs.get('seed', 0)).permutation(len(data))
+        blocks = np.array_split(order, folds)
+        return [(np.sort(np.concatenate(blocks[:k] + blocks[k + 1:])), np.sort(blocks[k])) for k in range(folds)]
+
+    # 'time': the rows are ordered by time_var and split into folds + 1 blocks. fold k trains on
+    # every block before block k + 1 and validates on block k + 1, so it never sees the future.
+    assert split == 'time'
+    time_var: str = kwargs.get('time_var')
+    order = np.argsort(data[time_var].to_numpy(), kind='stable')
+    blocks = np.array_split(order, folds + 1)
+    return [(np.sort(np.concatenate(blocks[:k + 1])), np.sort(blocks[k + 1])) for k in range(folds)]
+
+
+def _fold_task(task) -> List[dict]:
+    fold, schema, train, valid, cs, regression_params, binning_params = task
+
+    # the fold's categories, bins and design matrices are built once and reused for every C.
+    start_time = time.perf_counter()
+    scorecard = CreditScoreCard(schema=schema, binning_params=binning_params)
+    scorecard.train_categories(train)
+
+    # categories only seen in validation get a column too, whose coefficient stays at zero.
+    for predictor in scorecard.one_hot_encoders:
+        encoder = OneHotEncoder()
+        encoder.fit(pd.concat([train[[predictor]], valid[[predictor]]]))
+        scorecard.one_hot_encoders[predictor] = encoder
+    x_train, y_train = scorecard.preprocess(train)
+    x_valid, y_valid = scorecard.preprocess(valid)
+    preprocess_seconds = time.perf_counter() - start_time
+
+    # along the regularisation path each fit starts from the previous solution.
+    model = scorecard.regression_model
+    model.set_params(**regression_params)
+    model.set_params(warm_start=True)
+
+    rows = list()
+    for c in cs:
+        start_time = time.perf_counter()
+        model.set_params(C=c)
+        model.fit(x_train, y_train)
+        fit_seconds = time.perf_counter() - start_time
+
+        metrics = get_model_metrics(prediction=model.predict_proba(x_valid)[:, 1], actual=y_valid)
+
+        rows.append({
+            'fold': fold,
+            'C': c,
+            'auroc': metrics['auroc'],
+            'gini': 2.0 * metrics['auroc'] - 1.0,
+            'accuracy': metrics['accuracy'],
+            'iterations': int(np.max(model.n_iter_)),
+            'fit_seconds': fit_seconds,
+            'preprocess_seconds': preprocess_seconds
+        })
+
+    return rows
+
+
+def grid_search(data: pd.DataFrame, **kwargs) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # cross validated grid search over the regularisation strength C of a CreditScoreCard.
+    # column inference runs once; per fold, categories and bins are trained and the design matrices built
+    # once, then the whole grid is fitted on them with warm starts from the smallest C up.
+    # folds run in a process pool when workers > 1.
+    # returns the metrics per C (mean and standard deviation over folds) and per fold and C.
+    cs: List[float] = sorted(kwargs.get('Cs', np.logspace(-4, 4, 30).tolist()))
+    regression_params: dict = kwargs.get('regression_params', dict())
+    binning_params: dict = kwargs.get('binning_params', dict())
+    workers: int = kwargs.get('workers', 1) or os.cpu_count() or 1
+
+    schema: ColumnSchema = kwargs.get('schema') or infer_schema(data, **kwargs)
+
+    # the time variable of a time split orders the rows and is not a predictor.
+    time_var: Optional[str] = kwargs.get('time_var')
+    if time_var in schema.predictors:
+        keep = [i for i in range(len(schema.predictors)) if schema.predictors[i] != time_var]
+        schema = ColumnSchema(response=schema.response,
+                              predictors=[schema.predictors[i] for i in keep],
+                              column_types=[schema.column_types[i] for i in keep],
+                              id_var=schema.id_var)
+
+    # rows with missing values are dropped, as internal_process_columns does.
+    present = np.logical_not(data[[*schema.predictors, schema.response]].isna().any(axis=1).to_numpy())
+    if not np.all(present):
+        data = data[present]
+
+    tasks = [(k, schema, data.iloc[train], data.iloc[valid], cs, regression_params, binning_params)
+             for k, (train, valid) in enumerate(_fold_indices(data, **kwargs))]
+
+    if workers <= 1:
+        fold_rows = list(map(_fold_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fold_rows = list(executor.map(_fold_task, tasks))
+
+    folds = pd.DataFrame([row for rows in fold_rows for row in rows])
+
+    summary = folds.groupby('C').agg(auroc_mean=('auroc', 'mean'),
+                                     auroc_std=('auroc', 'std'),
+                                     gini_mean=('gini', 'mean'),
+                                     accuracy_mean=('accuracy', 'mean'),
+                                     iterations_mean=('iterations', 'mean'),
+                                     fit_seconds=('fit_seconds', 'sum'))
+
+    return summary, folds
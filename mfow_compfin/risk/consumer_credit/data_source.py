@@ -0,0 +1,52 @@
+import os
+import pandas as pd
+from typing import Iterator, List, Optional
+
+
+def is_one_shot(source) -> bool:
+    # whether reading source uses it up (an iterator or generator), so it cannot be read more than once.
+    if isinstance(source, (pd.DataFrame, str, os.PathLike)) or callable(source):
+        return False
+    return iter(source) is source
+
+
+def check_rereadable(source):
+    # for readers that pass over the data more than once.
+    if is_one_shot(source):
+        raise ValueError('The data source is read more than once, so it cannot be an iterator. Pass a list of '
+                         'DataFrames, a path, or a function returning a fresh iterator of DataFrames instead.')
+
+
+def iter_data_chunks(source, **kwargs) -> Iterator[pd.DataFrame]:
+    # a DataFrame, an iterable of DataFrames, a path to a CSV or Parquet file,
+    # or a function returning any of these, called once per pass over the data.
+    chunksize: int = kwargs.get('chunksize', 100000)
+    columns: Optional[List[str]] = kwargs.get('columns')
+
+    assert chunksize > 0
+
+    if callable(source) and not isinstance(source, pd.DataFrame):
+        source = source()
+
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+
+        if path.endswith('.parquet') or path.endswith('.pq'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError('Reading parquet files requires pyarrow.')
+
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+                yield chunk
+    else:
+        for chunk in source:
+            assert isinstance(chunk, pd.DataFrame)
+            yield chunk
@@ -0,0 +1,105 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterator, List, Optional, Union
+from mfow_compfin.yield_curve import YieldCurve
+from .scorecard import CreditScoreCard
+from .data_source import iter_data_chunks
+
+
+def __projected_cashflows(chunk: pd.DataFrame, cashflows: Union[List[str], Callable]) -> np.ndarray:
+    if callable(cashflows):
+        result = np.asarray(cashflows(chunk), dtype=float)
+    else:
+        result = chunk[cashflows].to_numpy(dtype=float)
+
+    assert result.shape[0] == len(chunk)
+    return result
+
+
+def iter_expected_loss(source, **kwargs) -> Iterator[pd.DataFrame]:
+    scorecard: CreditScoreCard = kwargs.get('scorecard')
+    curve: YieldCurve = kwargs.get('curve')
+    assert isinstance(scorecard, CreditScoreCard)
+    assert isinstance(curve, YieldCurve)
+
+    # projected cashflows per loan, either the columns holding them
+    # or a function from a chunk to a (loans x periods) matrix.
+    cashflows: Union[List[str], Callable] = kwargs.get('cashflows')
+    assert cashflows is not None
+
+    # the periods at which the projected cashflows are paid, defaulting to 1, 2, ...
+    cashflow_periods: Optional[np.ndarray] = kwargs.get('cashflow_periods')
+
+    # loss given default, either a constant or the column holding it
+    lgd: Union[float, str] = kwargs.get('lgd', 1.0)
+
+    # the number of periods the scorecard probability of default covers.
+    # None applies it to every cashflow, otherwise it is spread as a constant per-period hazard.
+    pd_horizon: Optional[float] = kwargs.get('pd_horizon')
+
+    clock: int = kwargs.get('clock', 0)
+    id_var: Optional[str] = kwargs.get('id_var')
+
+    for chunk in iter_data_chunks(source, chunksize=kwargs.get('chunksize', 100000)):
+        if len(chunk) == 0:
+            continue
+
+        prob_default = scorecard.prob_default(chunk)
+        projected = __projected_cashflows(chunk, cashflows)
+
+        if cashflow_periods is None:
+            periods = np.arange(1, projected.shape[1] + 1)
+        else:
+            periods = np.asarray(cashflow_periods)
+            assert periods.shape == (projected.shape[1],)
+
+        loss_given_default = chunk[lgd].to_numpy(dtype=float) if isinstance(lgd, str) else np.full(len(chunk), lgd)
+
+        if pd_horizon is None:
+            cumulative_default = np.repeat(prob_default[:, np.newaxis], len(periods), axis=1)
+        else:
+            assert pd_horizon > 0
+            elapsed = np.maximum(periods - clock, 0)
+            survival = np.power(1.0 - prob_default[:, np.newaxis], elapsed[np.newaxis, :] / pd_horizon)
+            cumulative_default = 1.0 - survival
+
+        risk_adjusted = projected * (1.0 - cumulative_default * loss_given_default[:, np.newaxis])
+
+        npv = curve.npv_batch(cashflows=projected, timestamps=periods, clock=clock)
+        risk_adjusted_npv = curve.npv_batch(cashflows=risk_adjusted, timestamps=periods, clock=clock)
+
+        result = pd.DataFrame({
+            'prob_default': prob_default,
+            'npv': npv,
+            'expected_loss': npv - risk_adjusted_npv,
+            'risk_adjusted_npv': risk_adjusted_npv
+        }, index=chunk.index)
+
+        if id_var is not None:
+            result.insert(0, id_var, chunk[id_var].to_numpy())
+
+        yield result
+
+
+def expected_loss_summary(source, **kwargs) -> dict:
+    start_time = time.perf_counter()
+
+    result = {
+        'loans': 0,
+        'npv': 0.0,
+        'expected_loss': 0.0,
+        'risk_adjusted_npv': 0.0
+    }
+
+    for chunk in iter_expected_loss(source, **kwargs):
+        result['loans'] += len(chunk)
+        result['npv'] += float(np.sum(chunk['npv']))
+        result['expected_loss'] += float(np.sum(chunk['expected_loss']))
+        result['risk_adjusted_npv'] += float(np.sum(chunk['risk_adjusted_npv']))
+
+    seconds = time.perf_counter() - start_time
+    result['seconds'] = seconds
+    result['loans_per_second'] = result['loans'] / seconds if seconds > 0 else 0.0
+
+    return result
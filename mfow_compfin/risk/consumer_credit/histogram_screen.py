@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from .column_types import CreditScoreCardColumnType
+
+
+# event and non-event counts per bin (continuous predictors) or per category (categorical predictors),
+# accumulated one chunk at a time. weight of evidence, information value and univariate AUC / gini
+# are computed from the counts alone, so chunks can be streamed from disk or accumulated on different
+# workers and merged.
+class HistogramScreen:
+    def __init__(self, **kwargs):
+        self.predictors: List[str] = kwargs.get('predictors')
+        self.column_types: List[CreditScoreCardColumnType] = kwargs.get('column_types')
+        self.response: str = kwargs.get('response')
+
+        # number of quantile bins for continuous predictors, with edges taken from the first chunk
+        # unless given per predictor in bin_edges.
+        self.bins: int = kwargs.get('bins', 20)
+        self.bin_edges: Dict[str, np.ndarray] = dict(kwargs.get('bin_edges', dict()))
+
+        # smoothing added to every count when taking logs.
+        self.smoothing: float = kwargs.get('smoothing', 0.5)
+
+        assert len(self.predictors) == len(self.column_types)
+        assert self.bins >= 2
+
+        self.rows: int = 0
+        self.missing: Dict[str, int] = {predictor: 0 for predictor in self.predictors}
+        self.events: Dict[str, np.ndarray] = dict()
+        self.non_events: Dict[str, np.ndarray] = dict()
+        self.categories: Dict[str, dict] = dict()
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            if self.column_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                self.categories[predictor] = dict()
+                self.events[predictor] = np.zeros(0)
+                self.non_events[predictor] = np.zeros(0)
+            elif self.column_types[i] in [CreditScoreCardColumnType.CONTINUOUS, CreditScoreCardColumnType.BIN]:
+                # binned predictors are screened on the same quantile bins as continuous ones.
+                if predictor in self.bin_edges:
+                    self.__init_bins(predictor, self.bin_edges[predictor])
+            else:
+                raise RuntimeError('Not supported column type')
+
+    def __init_bins(self, predictor: str, edges: np.ndarray):
+        edges = np.unique(np.asarray(edges, dtype=float))
+        self.bin_edges[predictor] = edges
+        self.events[predictor] = np.zeros(len(edges) + 1)
+        self.non_events[predictor] = np.zeros(len(edges) + 1)
+
+    def __add(self, predictor: str, codes: np.ndarray, response: np.ndarray, size: int):
+        self.events[predictor] += np.bincount(codes, weights=response, minlength=size)
+        self.non_events[predictor] += np.bincount(codes, weights=1.0 - response, minlength=size)
+
+    def __category_slots(self, predictor: str, values: np.ndarray) -> np.ndarray:
+        vocabulary = self.categories[predictor]
+
+        codes, uniques = pd.factorize(values)
+        slots = np.empty(len(uniques), dtype=np.int64)
+        for j, value in enumerate(uniques):
+            slots[j] = vocabulary.setdefault(value, len(vocabulary))
+
+        growth = len(vocabulary) - len(self.events[predictor])
+        if growth > 0:
+            self.events[predictor] = np.concatenate([self.events[predictor], np.zeros(growth)])
+            self.non_events[predictor] = np.concatenate([self.non_events[predictor], np.zeros(growth)])
+
+        return slots[codes]
+
+    def update(self, chunk: pd.DataFrame):
+        response = chunk[self.response].to_numpy(dtype=float, na_value=np.nan)
+        response_present = np.logical_not(np.isnan(response))
+        self.rows += len(chunk)
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            series = chunk[predictor]
+            present = response_present & series.notna().to_numpy()
+            self.missing[predictor] += len(chunk) - int(np.sum(present))
+
+            y = response[present]
+
+            if self.column_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                slots = self.__category_slots(predictor, series.to_numpy()[present])
+                self.__add(predictor, slots, y, len(self.categories[predictor]))
+            else:
+                x = series.to_numpy(dtype=float)[present]
+                if predictor not in self.bin_edges:
+                    quantiles = np.linspace(0.0, 1.0, self.bins + 1)[1:-1]
+                    self.__init_bins(predictor, np.quantile(x, quantiles) if len(x) > 0 else [])
+
+                edges = self.bin_edges[predictor]
+                self.__add(predictor, np.searchsorted(edges, x, side='right'), y, len(edges) + 1)
+
+        return self
+
+    def merge(self, other: 'HistogramScreen'):
+        assert other.predictors == self.predictors
+        self.rows += other.rows
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            self.missing[predictor] += other.missing[predictor]
+
+            if self.column_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                values = list(other.categories[predictor].keys())
+                slots = self.__category_slots(predictor, np.array(values, dtype=object))
+                np.add.at(self.events[predictor], slots, other.events[predictor][:len(values)])
+                np.add.at(self.non_events[predictor], slots, other.non_events[predictor][:len(values)])
+            elif predictor in other.bin_edges:
+                if predictor not in self.bin_edges:
+                    self.__init_bins(predictor, other.bin_edges[predictor])
+
+                assert np.array_equal(self.bin_edges[predictor], other.bin_edges[predictor])
+                self.events[predictor] += other.events[predictor]
+                self.non_events[predictor] += other.non_events[predictor]
+
+        return self
+
+    def weight_of_evidence(self, predictor: str) -> pd.DataFrame:
+        events = self.events.get(predictor, np.zeros(0))
+        non_events = self.non_events.get(predictor, np.zeros(0))
+
+        if predictor in self.categories:
+            labels = list(self.categories[predictor].keys())
+        else:
+            edges = self.bin_edges.get(predictor, np.zeros(0))
+            lower = np.concatenate([[-np.inf], edges])
+            upper = np.concatenate([edges, [np.inf]])
+            labels = ['[{:g}, {:g})'.format(lower[j], upper[j]) for j in range(len(lower))][:len(events)]
+
+        event_share = (events + self.smoothing) / (np.sum(events) + self.smoothing * len(events))
+        non_event_share = (non_events + self.smoothing) / (np.sum(non_events) + self.smoothing * len(non_events))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            event_rate = events / (events + non_events)
+
+        return pd.DataFrame({
+            'bin': labels,
+            'events': events,
+            'non_events': non_events,
+            'event_rate': event_rate,
+            'woe': np.log(non_event_share / event_share),
+            'information_value': (non_event_share - event_share) * np.log(non_event_share / event_share)
+        })
+
+    @staticmethod
+    def __auc(events: np.ndarray, non_events: np.ndarray) -> float:
+        # probability that an event scores above a non-event, with ties counted as half,
+        # when bins are scored in the given order.
+        total = np.sum(events) * np.sum(non_events)
+        if total == 0:
+            return np.nan
+
+        non_events_below = np.cumsum(non_events) - non_events
+        return float(np.sum(events * (non_events_below + 0.5 * non_events)) / total)
+
+    def results(self) -> pd.DataFrame:
+        rows: List[dict] = list()
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            events = self.events.get(predictor, np.zeros(0))
+            non_events = self.non_events.get(predictor, np.zeros(0))
+
+            if self.column_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                # the best ordering of categories is by event rate.
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    order = np.argsort(events / (events + non_events), kind='stable')
+                auroc = self.__auc(events[order], non_events[order])
+            else:
+                # a univariate model is monotone in the predictor, in either direction.
+                auroc = self.__auc(events, non_events)
+                auroc = max(auroc, 1.0 - auroc)
+
+            woe = self.weight_of_evidence(predictor)
+
+            rows.append({
+                'predictor': predictor,
+                'percent_missing': self.missing[predictor] * 100.0 / self.rows if self.rows > 0 else np.nan,
+                'information_value': float(np.sum(woe['information_value'])),
+                'auroc': auroc,
+                'gini': 2.0 * auroc - 1.0,
+                'bins': len(events)
+            })
+
+        return pd.DataFrame(rows).set_index('predictor')
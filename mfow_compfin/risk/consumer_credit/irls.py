@@ -0,0 +1,90 @@
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import spsolve
+from scipy.special import expit
+from typing import Callable, Iterator, Tuple
+
+
+def fit_logistic_irls(batches: Callable[[], Iterator[Tuple[sparse.csr_matrix, np.ndarray]]], **kwargs) -> dict:
+    # newton's method (iteratively reweighted least squares) for an l2 penalised logistic regression,
+    # minimising 0.5 * |w|^2 + C * sum(log loss) with an unpenalised intercept, the objective of
+    # sklearn's LogisticRegression(penalty='l2').
+    # batches() yields (design matrix, 0 / 1 response) pairs and is called once per iteration, so the data
+    # never has to be in memory at once: only the gradient and the (features + 1) square hessian are kept.
+    # the hessian is kept sparse, as one hot encoded columns of the same predictor are never both non zero,
+    # and each newton step is a sparse direct solve.
+    num_features: int = kwargs.get('num_features')
+    c: float = kwargs.get('C', 1.0)
+    fit_intercept: bool = kwargs.get('fit_intercept', True)
+    max_iter: int = kwargs.get('max_iter', 50)
+    tol: float = kwargs.get('tol', 1e-8)
+
+    assert c > 0.0
+
+    size = num_features + 1
+    # the intercept is the last parameter, without a penalty.
+    penalty = np.ones(size)
+    penalty[-1] = 0.0
+
+    params = np.zeros(size)
+    iterations = 0
+    converged = False
+    rows = 0
+    first_rows = None
+
+    for iterations in range(1, max_iter + 1):
+        gradient = penalty * params
+        # the hessian is c * [[x' w x, x' w 1], [1' w x, 1' w 1]] plus the penalty on the diagonal.
+        gram = sparse.csr_matrix((num_features, num_features))
+        column_weights = np.zeros(num_features)
+        total_weight = 0.0
+        rows = 0
+
+        for x, y in batches():
+            x = sparse.csr_matrix(x)
+            eta = x @ params[:-1] + params[-1]
+            p = expit(eta)
+            w = p * (1.0 - p)
+            residual = p - y
+
+            gradient[:-1] += c * (x.T @ residual)
+            gradient[-1] += c * np.sum(residual)
+
+            xw = x.T @ sparse.diags(w)
+            gram = gram + xw @ x
+            column_weights += np.asarray(xw.sum(axis=1)).ravel()
+            total_weight += np.sum(w)
+
+            rows += len(y)
+
+        # every pass must see the same data, which fails silently when batches() keeps returning a used up iterator.
+        if rows == 0 or (first_rows is not None and rows != first_rows):
+            raise RuntimeError('Pass {} over the data read {} rows, expected {}. batches() must return the same '
+                               'data on every call.'.format(iterations, rows, first_rows))
+        first_rows = rows
+
+        if fit_intercept:
+            border = c * column_weights[:, np.newaxis]
+            corner = c * total_weight
+        else:
+            gradient[-1] = 0.0
+            border = None
+            corner = 1.0
+
+        hessian = sparse.bmat([[c * gram + sparse.diags(penalty[:-1]), border],
+                               [None if border is None else border.T, np.array([[corner]])]], format='csc')
+
+        step = spsolve(hessian, gradient)
+        params -= step
+
+        if np.max(np.abs(step)) <= tol * max(1.0, np.max(np.abs(params))):
+            converged = True
+            break
+
+    return {
+        'coef': params[:-1],
+        'intercept': params[-1],
+        'iterations': iterations,
+        'converged': converged,
+        'rows': rows
+    }
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 from sklearn.metrics import roc_auc_score
 
 
@@ -16,3 +17,203 @@ def get_model_metrics(**kwargs) -> dict:
 
     return result
 
+
+def _histogram_auc(events: np.ndarray, non_events: np.ndarray) -> np.ndarray:
+    # probability that an event scores above a non-event with ties counted as half, for scores grouped
+    # into ascending bins. the last axis is the bins, so replicates can be stacked in front.
+    non_events_below = np.cumsum(non_events, axis=-1) - non_events
+    pairs = np.sum(events, axis=-1) * np.sum(non_events, axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sum(events * (non_events_below + 0.5 * non_events), axis=-1) / pairs
+
+
+class ModelMetricsAccumulator:
+    # model metrics over predictions fed one chunk at a time, kept as event / non-event counts per score bin,
+    # so that accumulators on different chunks or workers can be merged.
+    # with exact=True the bins are the distinct scores and AUROC and KS are exact; otherwise scores in
+    # [0, 1] fall in `bins` uniform bins and AUROC is within auroc_error_bound of the exact value.
+    # exact mode keeps every distinct score, so with continuous scores its state grows with the rows seen.
+    # chunks are queued and merged into the state only once they outnumber it (and before results), so
+    # feeding n rows costs O(n log n) overall.
+    def __init__(self, **kwargs):
+        self.exact: bool = kwargs.get('exact', False)
+        self.bins: int = kwargs.get('bins', 10000)
+
+        # poisson bootstrap replicates of the counts, for confidence intervals (histogram mode only).
+        self.bootstrap: int = kwargs.get('bootstrap', 0)
+        self.rng = np.random.default_rng(kwargs.get('seed'))
+
+        assert self.bins >= 1
+        assert self.bootstrap >= 0
+        assert not (self.exact and self.bootstrap > 0)
+
+        size = 0 if self.exact else self.bins
+
+        self.rows: int = 0
+        self.correct: int = 0
+        self.scores: np.ndarray = np.zeros(0)
+        self.events: np.ndarray = np.zeros(size)
+        self.non_events: np.ndarray = np.zeros(size)
+        self.score_sums: np.ndarray = np.zeros(size)
+        self.bootstrap_events: np.ndarray = np.zeros((self.bootstrap, size))
+        self.bootstrap_non_events: np.ndarray = np.zeros((self.bootstrap, size))
+
+        # exact mode (scores, events, non events, score sums) per chunk not yet merged into the state.
+        self.__pending: list = list()
+        self.__pending_scores: int = 0
+
+    def __bin(self, prediction: np.ndarray) -> np.ndarray:
+        return np.clip((prediction * self.bins).astype(np.int64), 0, self.bins - 1)
+
+    def update(self, prediction: np.ndarray, actual: np.ndarray):
+        prediction = np.asarray(prediction, dtype=float)
+        actual = np.asarray(actual, dtype=float)
+        assert prediction.shape == actual.shape
+
+        self.rows += len(prediction)
+        self.correct += int(np.sum((prediction >= 0.5) == actual))
+
+        if self.exact:
+            scores, codes = np.unique(prediction, return_inverse=True)
+            self.__queue_scores(scores,
+                                np.bincount(codes, weights=actual, minlength=len(scores)),
+                                np.bincount(codes, weights=1.0 - actual, minlength=len(scores)),
+                                np.bincount(codes, weights=prediction, minlength=len(scores)))
+            return self
+
+        codes = self.__bin(prediction)
+        self.events += np.bincount(codes, weights=actual, minlength=self.bins)
+        self.non_events += np.bincount(codes, weights=1.0 - actual, minlength=self.bins)
+        self.score_sums += np.bincount(codes, weights=prediction, minlength=self.bins)
+
+        if self.bootstrap > 0:
+            # every row gets a poisson(1) weight per replicate, and all replicates are counted with one
+            # bincount over (replicate, bin) pairs, in blocks to bound the memory used.
+            block = max(1, 1000000 // self.bootstrap)
+            offsets = (np.arange(self.bootstrap) * self.bins)[:, np.newaxis]
+            size = self.bootstrap * self.bins
+
+            for start in range(0, len(codes), block):
+                block_codes = codes[start:start + block]
+                block_actual = actual[start:start + block]
+                weights = self.rng.poisson(1.0, size=(self.bootstrap, len(block_codes)))
+                flat_codes = (offsets + block_codes[np.newaxis, :]).ravel()
+
+                self.bootstrap_events += np.bincount(flat_codes, weights=(weights * block_actual).ravel(),
+                                                     minlength=size).reshape(self.bootstrap, self.bins)
+                self.bootstrap_non_events += np.bincount(flat_codes, weights=(weights * (1.0 - block_actual)).ravel(),
+                                                         minlength=size).reshape(self.bootstrap, self.bins)
+
+        return self
+
+    def __queue_scores(self, scores: np.ndarray, events: np.ndarray, non_events: np.ndarray,
+                       score_sums: np.ndarray):
+        self.__pending.append((scores, events, non_events, score_sums))
+        self.__pending_scores += len(scores)
+
+        # merging once the queue outnumbers the state merges every score O(log n) times.
+        if self.__pending_scores > len(self.scores):
+            self.__merge_pending()
+
+    def __merge_pending(self):
+        if len(self.__pending) == 0:
+            return
+
+        parts = [(self.scores, self.events, self.non_events, self.score_sums), *self.__pending]
+        merged, codes = np.unique(np.concatenate([part[0] for part in parts]), return_inverse=True)
+        codes = codes.ravel()
+        self.events = np.bincount(codes, weights=np.concatenate([part[1] for part in parts]), minlength=len(merged))
+        self.non_events = np.bincount(codes, weights=np.concatenate([part[2] for part in parts]),
+                                      minlength=len(merged))
+        self.score_sums = np.bincount(codes, weights=np.concatenate([part[3] for part in parts]),
+                                      minlength=len(merged))
+        self.scores = merged
+
+        self.__pending = list()
+        self.__pending_scores = 0
+
+    def merge(self, other: 'ModelMetricsAccumulator'):
+        assert isinstance(other, ModelMetricsAccumulator)
+        assert other.exact == self.exact
+        assert self.exact or other.bins == self.bins
+        assert other.bootstrap == self.bootstrap
+
+        self.rows += other.rows
+        self.correct += other.correct
+
+        if self.exact:
+            other.__merge_pending()
+            self.__queue_scores(other.scores, other.events, other.non_events, other.score_sums)
+        else:
+            self.events += other.events
+            self.non_events += other.non_events
+            self.score_sums += other.score_sums
+            self.bootstrap_events += other.bootstrap_events
+            self.bootstrap_non_events += other.bootstrap_non_events
+
+        return self
+
+    def calibration(self, groups: int = 10) -> pd.DataFrame:
+        # mean prediction and observed event rate by score decile (or other number of groups),
+        # with whole bins assigned to the group their last row falls in.
+        self.__merge_pending()
+        counts = self.events + self.non_events
+        cumulative = np.cumsum(counts)
+        total = cumulative[-1] if len(cumulative) > 0 else 0.0
+
+        group = np.minimum((groups * cumulative / max(total, 1.0) - 1e-9).astype(np.int64), groups - 1)
+        group = np.maximum(group, 0)
+
+        rows = np.bincount(group, weights=counts, minlength=groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'rows': rows,
+                'mean_prediction': np.bincount(group, weights=self.score_sums, minlength=groups) / rows,
+                'event_rate': np.bincount(group, weights=self.events, minlength=groups) / rows
+            })
+
+    def results(self, confidence: float = 0.95) -> dict:
+        self.__merge_pending()
+        result = dict()
+
+        result['rows'] = self.rows
+        result['accuracy'] = self.correct / self.rows if self.rows > 0 else np.nan
+
+        auroc = float(_histogram_auc(self.events, self.non_events))
+        result['auroc'] = auroc
+        result['gini'] = 2.0 * auroc - 1.0
+
+        # pairs of an event and a non-event in the same bin are counted as half, which is off by at most half.
+        pairs = np.sum(self.events) * np.sum(self.non_events)
+        if self.exact:
+            result['auroc_error_bound'] = 0.0
+        else:
+            result['auroc_error_bound'] = float(0.5 * np.sum(self.events * self.non_events) / pairs) \
+                if pairs > 0 else np.nan
+
+        # largest gap between the score distributions of events and non-events (at bin edges when binned).
+        with np.errstate(invalid='ignore', divide='ignore'):
+            event_cdf = np.cumsum(self.events) / np.sum(self.events)
+            non_event_cdf = np.cumsum(self.non_events) / np.sum(self.non_events)
+        result['ks'] = float(np.max(np.abs(event_cdf - non_event_cdf), initial=0.0))
+
+        result['calibration'] = self.calibration()
+
+        if self.bootstrap > 0:
+            replicates = _histogram_auc(self.bootstrap_events, self.bootstrap_non_events)
+            tail = (1.0 - confidence) / 2.0 * 100.0
+            lower, upper = np.nanpercentile(replicates, [tail, 100.0 - tail])
+            result['auroc_ci'] = (float(lower), float(upper))
+            result['gini_ci'] = (2.0 * float(lower) - 1.0, 2.0 * float(upper) - 1.0)
+
+        return result
+
+
+def get_streaming_model_metrics(**kwargs) -> dict:
+    # get_model_metrics through a ModelMetricsAccumulator, e.g. with exact=False for large evaluations.
+    prediction: np.ndarray = kwargs.pop('prediction')
+    actual: np.ndarray = kwargs.pop('actual')
+    confidence: float = kwargs.pop('confidence', 0.95)
+
+    return ModelMetricsAccumulator(**kwargs).update(prediction, actual).results(confidence)
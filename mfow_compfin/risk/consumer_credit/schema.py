@@ -0,0 +1,130 @@
+import pandas as pd
+from typing import List, Optional
+from .column_types import CreditScoreCardColumnType
+from .data_source import iter_data_chunks
+from mfow_compfin.persistence import save_artifact, load_artifact
+
+
+class ColumnSchema:
+    # the response, predictors and column types of a data feed, inferred once with infer_schema
+    # and passed as schema= to CreditScoreCard or screen_predictors to skip inference.
+    def __init__(self, **kwargs):
+        self.response: str = kwargs.get('response')
+        self.predictors: List[str] = list(kwargs.get('predictors'))
+        self.column_types: List[CreditScoreCardColumnType] = list(kwargs.get('column_types'))
+        self.id_var: Optional[str] = kwargs.get('id_var')
+
+        assert len(self.predictors) == len(self.column_types)
+        assert self.response not in self.predictors
+
+    def to_dict(self) -> dict:
+        return {
+            'response': self.response,
+            'predictors': self.predictors,
+            'column_types': [column_type.name for column_type in self.column_types],
+            'id_var': self.id_var
+        }
+
+    @staticmethod
+    def from_dict(values: dict) -> 'ColumnSchema':
+        return ColumnSchema(response=values['response'],
+                            predictors=values['predictors'],
+                            column_types=[CreditScoreCardColumnType[name] for name in values['column_types']],
+                            id_var=values.get('id_var'))
+
+    def save(self, path: str):
+        save_artifact(path, kind='ColumnSchema', meta=self.to_dict(), arrays=dict())
+
+    @staticmethod
+    def load(path: str) -> 'ColumnSchema':
+        return ColumnSchema.from_dict(load_artifact(path, kind='ColumnSchema', mmap=False)['meta'])
+
+
+def __count_values(values, seen: set, missing: dict, predictor: str, max_categories: int) -> bool:
+    # adds the distinct values to seen in blocks of doubling size, returning True as soon as there are
+    # more than max_categories of them, so that a continuous column is usually decided from its first block.
+    start = 0
+    block = 256
+
+    while start < len(values):
+        uniques = pd.unique(values[start:start + block])
+        present = uniques[pd.notna(uniques)]
+        missing[predictor] = missing.get(predictor, False) or len(present) < len(uniques)
+
+        if len(present) > max_categories:
+            return True
+
+        seen.update(present.tolist())
+        if len(seen) + missing[predictor] > max_categories:
+            return True
+
+        start += block
+        block *= 2
+
+    return False
+
+
+def infer_schema(source, **kwargs) -> ColumnSchema:
+    # source is a DataFrame, an iterable of DataFrames or a CSV / Parquet path.
+    # text columns are categorical. numeric columns are categorical when they have at most max_categories
+    # distinct values (missing counting as one), otherwise continuous (or binned when bin_continuous is set).
+    # values are counted a chunk at a time and a column stops being counted as soon as it passes
+    # max_categories, so wide feeds of mostly continuous columns are typically decided from the first chunk.
+    predictors: Optional[List[str]] = kwargs.get('predictors')
+    response = kwargs.get('response')
+    id_var: Optional[str] = kwargs.get('id_var')
+    max_categories: int = kwargs.get('max_categories', 10)
+    bin_continuous: bool = kwargs.get('bin_continuous', False)
+
+    # only the first sample_rows rows are inspected when given.
+    sample_rows: Optional[int] = kwargs.get('sample_rows')
+
+    numeric_type = CreditScoreCardColumnType.BIN if bin_continuous else CreditScoreCardColumnType.CONTINUOUS
+
+    column_types = dict()
+    values = dict()
+    missing = dict()
+    rows = 0
+    data_columns: Optional[List[str]] = None
+
+    for chunk in iter_data_chunks(source, chunksize=kwargs.get('chunksize', 65536)):
+        if data_columns is None:
+            data_columns = list(chunk)
+
+            if isinstance(response, int):
+                response = data_columns[response]
+
+            if predictors is None:
+                predictors = [column for column in data_columns if column != response]
+
+            predictors = [predictor for predictor in predictors if predictor != id_var]
+
+            for predictor in predictors:
+                assert predictor in data_columns
+
+        if sample_rows is not None:
+            chunk = chunk.iloc[:max(sample_rows - rows, 0)]
+        rows += len(chunk)
+
+        undecided = [predictor for predictor in predictors if predictor not in column_types]
+
+        for predictor in undecided:
+            series = chunk[predictor]
+
+            if series.dtype in ['str', 'object']:
+                column_types[predictor] = CreditScoreCardColumnType.CATEGORICAL
+                continue
+
+            seen = values.setdefault(predictor, set())
+            if __count_values(series.to_numpy(), seen, missing, predictor, max_categories):
+                column_types[predictor] = numeric_type
+                del values[predictor]
+
+        if len(column_types) == len(predictors) or (sample_rows is not None and rows >= sample_rows):
+            break
+
+    assert predictors is not None
+
+    result_types = [column_types.get(predictor, CreditScoreCardColumnType.CATEGORICAL) for predictor in predictors]
+
+    return ColumnSchema(response=response, predictors=predictors, column_types=result_types, id_var=id_var)
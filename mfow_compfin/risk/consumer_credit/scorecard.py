@@ -1,11 +1,20 @@
+import json
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional
+import scipy.sparse as sparse
+from typing import Iterator, List, Dict, Optional, Tuple
 from .consumer_columns import internal_process_columns
 from .consumer_columns import CreditScoreCardColumnType
+from .schema import ColumnSchema
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.linear_model import LogisticRegression
-from .model_metrics import get_model_metrics
+from .model_metrics import get_model_metrics, ModelMetricsAccumulator
+from .compiled_scorecard import CompiledScoreCard
+from .binning import fit_bins, apply_bins
+from .data_source import iter_data_chunks, check_rereadable
+from .irls import fit_logistic_irls
+from mfow_compfin.persistence import save_artifact, load_artifact
+from mfow_compfin.instrumentation import instrumented
 
 
 class CreditScoreCard:
@@ -16,7 +25,12 @@ class CreditScoreCard:
         self.response: str = column_data['response']
         self.predictors: List[str] = column_data['predictors']
         self.data_types: List[CreditScoreCardColumnType] = column_data['column_types']
+        # pass as schema= to build further scorecards on the same feed without inference.
+        self.schema: ColumnSchema = column_data['schema']
         self.one_hot_encoders: Dict[str, OneHotEncoder] = dict()
+        # cut points of binned predictors, see fit_bins.
+        self.bin_edges: Dict[str, np.ndarray] = dict()
+        self.binning_params: dict = kwargs.get('binning_params', dict())
         self.regression_model = LogisticRegression()
 
     def train_categories(self, data: Optional[pd.DataFrame] = None):
@@ -26,48 +40,308 @@ class CreditScoreCard:
         assert isinstance(data, pd.DataFrame)
 
         for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
             if self.data_types[i] is CreditScoreCardColumnType.CATEGORICAL:
-                predictor = self.predictors[i]
                 encoder = OneHotEncoder()
-                encoder.fit_transform(data[[predictor]])
+                encoder.fit(data[[predictor]])
                 self.one_hot_encoders[predictor] = encoder
+            elif self.data_types[i] is CreditScoreCardColumnType.BIN:
+                # bins are learnt against the response.
+                self.bin_edges[predictor] = fit_bins(data[predictor].to_numpy(dtype=float),
+                                                     data[self.response].to_numpy(dtype=float),
+                                                     **self.binning_params)
+
+    def __iter_training_chunks(self, source, chunksize: int) -> Iterator[pd.DataFrame]:
+        # chunks of the training data without the rows that have missing values, as internal_process_columns.
+        columns = [*self.predictors, self.response]
+
+        for chunk in iter_data_chunks(source, chunksize=chunksize):
+            if any(chunk[column].hasnans for column in columns):
+                chunk = chunk[columns].dropna()
+            yield chunk
+
+    def train_categories_chunked(self, source, **kwargs):
+        # train_categories in one streaming pass over an iterable of DataFrames or a CSV / Parquet path.
+        # category vocabularies are gathered from every chunk, while bins are learnt on the first chunk.
+        chunksize: int = kwargs.get('chunksize', 100000)
+
+        vocabularies: Dict[str, np.ndarray] = dict()
+        first_chunk = True
+
+        for chunk in self.__iter_training_chunks(source, chunksize):
+            for i in range(len(self.predictors)):
+                predictor = self.predictors[i]
 
-    def preprocess(self, data: Optional[pd.DataFrame] = None) -> np.ndarray:
+                if self.data_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                    values = pd.unique(chunk[predictor].to_numpy())
+                    if predictor in vocabularies:
+                        values = np.concatenate([vocabularies[predictor], values])
+                    vocabularies[predictor] = np.unique(values)
+                elif self.data_types[i] is CreditScoreCardColumnType.BIN and first_chunk:
+                    self.bin_edges[predictor] = fit_bins(chunk[predictor].to_numpy(dtype=float),
+                                                         chunk[self.response].to_numpy(dtype=float),
+                                                         **self.binning_params)
+
+            first_chunk = False
+
+        for predictor, categories in vocabularies.items():
+            encoder = OneHotEncoder(categories=[categories])
+            encoder.fit(pd.DataFrame({predictor: categories}))
+            self.one_hot_encoders[predictor] = encoder
+
+    def column_widths(self) -> List[int]:
+        # the number of design matrix columns of each predictor.
+        widths: List[int] = list()
+
+        for i in range(len(self.predictors)):
+            data_type = self.data_types[i]
+
+            if data_type is CreditScoreCardColumnType.CONTINUOUS:
+                widths.append(1)
+            elif data_type is CreditScoreCardColumnType.CATEGORICAL:
+                widths.append(len(self.one_hot_encoders[self.predictors[i]].categories_[0]))
+            elif data_type is CreditScoreCardColumnType.BIN:
+                widths.append(len(self.bin_edges[self.predictors[i]]) + 1)
+            else:
+                raise RuntimeError('Unsupported column type')
+
+        return widths
+
+    def category_codes(self, predictor: str, values: pd.Series) -> np.ndarray:
+        # the index of each value in the predictor's category vocabulary.
+        categories = self.one_hot_encoders[predictor].categories_[0]
+        codes = pd.Categorical(values, categories=categories).codes
+
+        if np.any(codes < 0):
+            unknown = pd.unique(values[codes < 0])
+            raise ValueError('Found unknown categories {} in column {}'.format(list(unknown[:10]), predictor))
+
+        return codes
+
+    @instrumented('consumer_credit.preprocess', rows=lambda result, *args, **kwargs: result[0].shape[0])
+    def preprocess(self, data: Optional[pd.DataFrame] = None) -> Tuple[sparse.csr_matrix, Optional[np.ndarray]]:
         if data is None:
             data = self.data
 
         assert isinstance(data, pd.DataFrame)
 
-        results: List[np.ndarray] = list()
+        num_rows = len(data)
+        num_predictors = len(self.predictors)
+        column_offsets = np.concatenate([[0], np.cumsum(self.column_widths())]).astype(np.int64)
 
-        for i in range(len(self.predictors)):
+        # every row stores exactly one entry per predictor: the value of a continuous predictor,
+        # or a one in the column of a categorical predictor's category or a binned predictor's bin.
+        indices = np.empty((num_rows, num_predictors), dtype=np.int64)
+        values = np.empty((num_rows, num_predictors), dtype=float)
+
+        for i in range(num_predictors):
             data_type = self.data_types[i]
             predictor = self.predictors[i]
 
             if data_type is CreditScoreCardColumnType.CONTINUOUS:
-                result = data[[predictor]].to_numpy()
+                indices[:, i] = column_offsets[i]
+                values[:, i] = data[predictor].to_numpy(dtype=float)
             elif data_type is CreditScoreCardColumnType.CATEGORICAL:
-                result = self.one_hot_encoders[predictor].transform(data[[predictor]])
+                indices[:, i] = column_offsets[i] + self.category_codes(predictor, data[predictor])
+                values[:, i] = 1.0
             elif data_type is CreditScoreCardColumnType.BIN:
-                raise NotImplementedError()
+                indices[:, i] = column_offsets[i] + apply_bins(self.bin_edges[predictor],
+                                                               data[predictor].to_numpy(dtype=float))
+                values[:, i] = 1.0
             else:
                 raise RuntimeError('Unsupported column type')
 
-            results.append(result)
+        indptr = np.arange(0, num_rows * num_predictors + 1, num_predictors, dtype=np.int64)
+        x = sparse.csr_matrix((values.ravel(), indices.ravel(), indptr), shape=(num_rows, column_offsets[-1]))
 
-        x = np.concatenate(results, axis=1)
-        y = np.array(data[self.response])
+        # data being scored does not need to contain the response.
+        y = np.array(data[self.response]) if self.response in data else None
         return x, y
 
+    @instrumented('consumer_credit.fit',
+                  rows=lambda result, self, data=None, **kwargs: len(self.data if data is None else data))
     def fit(self, data: Optional[pd.DataFrame] = None) -> np.ndarray:
         x, y = self.preprocess(data)
         self.regression_model.fit(x, y)
 
+    def fit_chunked(self, source, **kwargs) -> dict:
+        # fit in passes over an iterable of DataFrames (e.g. a list), a CSV / Parquet path or a function returning
+        # a fresh iterator of DataFrames, reading the data once per newton iteration, so it never has to fit in
+        # memory. the model minimises the same penalised log loss as fit, using the C and fit_intercept settings
+        # of the regression model. the regression model is only updated when the fit converges.
+        chunksize: int = kwargs.get('chunksize', 100000)
+        params = self.regression_model.get_params()
+        assert params['penalty'] in ['l2', 'deprecated'] and params.get('l1_ratio') in [None, 0.0]
+        assert params['class_weight'] is None
+        check_rereadable(source)
+
+        classes = np.zeros(0)
+        for chunk in self.__iter_training_chunks(source, chunksize):
+            classes = np.unique(np.concatenate([classes, pd.unique(chunk[self.response].to_numpy())]))
+        assert len(classes) == 2
+
+        def batches():
+            for chunk in self.__iter_training_chunks(source, chunksize):
+                x, y = self.preprocess(chunk)
+                yield x, (y == classes[1]).astype(float)
+
+        result = fit_logistic_irls(batches,
+                                   num_features=int(np.sum(self.column_widths())),
+                                   C=params['C'],
+                                   fit_intercept=params['fit_intercept'],
+                                   max_iter=kwargs.get('max_iter', 50),
+                                   tol=kwargs.get('tol', 1e-8))
+
+        if not result['converged'] or not np.all(np.isfinite(result['coef'])) \
+                or not np.isfinite(result['intercept']):
+            raise RuntimeError('The chunked fit did not converge in {} iterations.'.format(result['iterations']))
+
+        self.regression_model.coef_ = result['coef'][np.newaxis, :]
+        self.regression_model.intercept_ = np.array([result['intercept']])
+        self.regression_model.classes_ = classes
+        self.regression_model.n_features_in_ = len(result['coef'])
+
+        return {key: result[key] for key in ['iterations', 'converged', 'rows']}
+
+    @instrumented('consumer_credit.prob_default', rows=lambda result, *args, **kwargs: len(result))
     def prob_default(self, data: Optional[pd.DataFrame] = None):
         x, y = self.preprocess(data)
         return self.regression_model.predict_proba(x)[:, 1]
 
-    def evaluate(self, data: Optional[pd.DataFrame] = None) -> dict:
+    def evaluate(self, data: Optional[pd.DataFrame] = None, **kwargs) -> dict:
         x, y = self.preprocess(data)
         predicted = self.regression_model.predict_proba(x)[:, 1]
+
+        # the predictions are added to a ModelMetricsAccumulator when one is given, and its metrics returned.
+        accumulator: Optional[ModelMetricsAccumulator] = kwargs.get('accumulator')
+        if accumulator is not None:
+            return accumulator.update(predicted, y).results()
+
         return get_model_metrics(prediction=predicted, actual=y)
+
+    def evaluate_chunked(self, source, **kwargs) -> dict:
+        # evaluate over an iterable of DataFrames or a CSV / Parquet path, one chunk at a time.
+        # other arguments configure the ModelMetricsAccumulator (exact, bins, bootstrap, seed).
+        chunksize: int = kwargs.pop('chunksize', 100000)
+        accumulator = ModelMetricsAccumulator(**kwargs)
+
+        for chunk in self.__iter_training_chunks(source, chunksize):
+            x, y = self.preprocess(chunk)
+            accumulator.update(self.regression_model.predict_proba(x)[:, 1], y)
+
+        return accumulator.results()
+
+    def compile(self) -> CompiledScoreCard:
+        # lookup tables equivalent to the fitted regression model.
+        coef = np.asarray(self.regression_model.coef_)[0]
+        column_offsets = np.concatenate([[0], np.cumsum(self.column_widths())])
+
+        coefficients = dict()
+        categories = dict()
+        bin_edges = dict()
+        contributions = dict()
+
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            columns = coef[column_offsets[i]:column_offsets[i + 1]]
+
+            if self.data_types[i] is CreditScoreCardColumnType.CONTINUOUS:
+                coefficients[predictor] = columns[0]
+            elif self.data_types[i] is CreditScoreCardColumnType.CATEGORICAL:
+                categories[predictor] = self.one_hot_encoders[predictor].categories_[0]
+                contributions[predictor] = np.array(columns)
+            elif self.data_types[i] is CreditScoreCardColumnType.BIN:
+                bin_edges[predictor] = np.array(self.bin_edges[predictor])
+                contributions[predictor] = np.array(columns)
+            else:
+                raise RuntimeError('Unsupported column type')
+
+        return CompiledScoreCard(predictors=list(self.predictors),
+                                 data_types=list(self.data_types),
+                                 intercept=self.regression_model.intercept_[0],
+                                 coefficients=coefficients,
+                                 categories=categories,
+                                 bin_edges=bin_edges,
+                                 contributions=contributions)
+
+    def save(self, path: str):
+        # only the fitted parameters are saved, not the training data.
+        arrays = {
+            'coef': self.regression_model.coef_,
+            'intercept': self.regression_model.intercept_,
+            'classes': self.regression_model.classes_
+        }
+
+        category_kinds = dict()
+        for i in range(len(self.predictors)):
+            predictor = self.predictors[i]
+            if predictor in self.one_hot_encoders:
+                categories = self.one_hot_encoders[predictor].categories_[0]
+                if categories.dtype.hasobject:
+                    categories = categories.astype(str)
+                    category_kinds[predictor] = 'object'
+                arrays['categories/{}'.format(i)] = categories
+            if predictor in self.bin_edges:
+                arrays['bin_edges/{}'.format(i)] = self.bin_edges[predictor]
+
+        # estimator settings that are not plain values (e.g. a RandomState) are not kept.
+        regression_params = dict()
+        for key, value in self.regression_model.get_params().items():
+            try:
+                json.dumps(value)
+                regression_params[key] = value
+            except TypeError:
+                pass
+
+        meta = {
+            'response': self.response,
+            'predictors': self.predictors,
+            'column_types': [data_type.name for data_type in self.data_types],
+            'category_kinds': category_kinds,
+            'binning_params': self.binning_params,
+            'regression_params': regression_params
+        }
+
+        save_artifact(path, kind='CreditScoreCard', meta=meta, arrays=arrays)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'CreditScoreCard':
+        artifact = load_artifact(path, kind='CreditScoreCard', mmap=mmap)
+        meta = artifact['meta']
+        arrays = artifact['arrays']
+
+        scorecard = CreditScoreCard.__new__(CreditScoreCard)
+        scorecard.data = None
+        scorecard.response = meta['response']
+        scorecard.predictors = meta['predictors']
+        scorecard.data_types = [CreditScoreCardColumnType[name] for name in meta['column_types']]
+        scorecard.schema = ColumnSchema(response=scorecard.response, predictors=scorecard.predictors,
+                                        column_types=scorecard.data_types)
+        scorecard.one_hot_encoders = dict()
+        scorecard.bin_edges = dict()
+        scorecard.binning_params = meta.get('binning_params', dict())
+
+        for i in range(len(scorecard.predictors)):
+            key = 'bin_edges/{}'.format(i)
+            if key in arrays:
+                scorecard.bin_edges[scorecard.predictors[i]] = np.array(arrays[key])
+
+            key = 'categories/{}'.format(i)
+            if key in arrays:
+                predictor = scorecard.predictors[i]
+                categories = np.asarray(arrays[key])
+                if meta['category_kinds'].get(predictor) == 'object':
+                    categories = categories.astype(object)
+
+                # fitting on the vocabulary alone restores the encoder.
+                encoder = OneHotEncoder(categories=[categories])
+                encoder.fit(pd.DataFrame({predictor: categories}))
+                scorecard.one_hot_encoders[predictor] = encoder
+
+        scorecard.regression_model = LogisticRegression(**meta['regression_params'])
+        scorecard.regression_model.coef_ = arrays['coef']
+        scorecard.regression_model.intercept_ = arrays['intercept']
+        scorecard.regression_model.classes_ = arrays['classes']
+        scorecard.regression_model.n_features_in_ = arrays['coef'].shape[1]
+
+        return scorecard
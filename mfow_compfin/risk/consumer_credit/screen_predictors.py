@@ -1,66 +1,176 @@
+import os
+import time
+import tempfile
 import numpy as np
 import pandas as pd
-from typing import List, Dict
+import scipy.sparse as sparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
 from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import OneHotEncoder
 from .consumer_columns import internal_process_columns
 from .column_types import CreditScoreCardColumnType
-from .model_metrics import get_model_metrics
+from .model_metrics import get_model_metrics, get_streaming_model_metrics
+from .histogram_screen import HistogramScreen
+from .data_source import iter_data_chunks
+from .binning import fit_bins, apply_bins
+from mfow_compfin.instrumentation import instrumented, record
 
 
-def __screen_predictor(predictor: pd.Series, response: pd.Series, **kwargs):
+# (predictors + 1) x rows matrix used by the current worker process: one row per predictor, with
+# categorical predictors as category codes and missing values as nan, and the response last.
+_screen_values: Optional[np.ndarray] = None
+
+
+def _init_screen_values(path: str, shape: tuple):
+    global _screen_values
+    _screen_values = np.memmap(path, dtype=float, mode='r', shape=shape)
+
+
+def __screen_predictor(predictor: np.ndarray, response: np.ndarray, **kwargs):
     assert len(predictor) == len(response)
     original_length = len(predictor)
 
-    df = pd.DataFrame({
-        'predictor': predictor,
-        'response': response
-    }).dropna()
+    present = np.logical_not(np.isnan(predictor) | np.isnan(response))
+    predictor = predictor[present]
+    response_np = response[present]
 
     result = dict()
 
-    result['percent_missing'] = 100.0 - (len(df) * 100.0 / original_length)
+    result['percent_missing'] = 100.0 - (len(predictor) * 100.0 / original_length)
 
     column_type: CreditScoreCardColumnType = kwargs.get('column_type')
 
-    if column_type is CreditScoreCardColumnType.CATEGORICAL:
-        encoder = OneHotEncoder()
-        predictor_np = encoder.fit_transform(df[['predictor']])
+    if column_type is CreditScoreCardColumnType.CATEGORICAL or column_type is CreditScoreCardColumnType.BIN:
+        if column_type is CreditScoreCardColumnType.BIN:
+            predictor = apply_bins(fit_bins(predictor, response_np, **kwargs.get('binning_params', dict())),
+                                   predictor)
+
+        # one hot encode the categories (or bins) present, in sorted order as OneHotEncoder would.
+        _, codes = np.unique(predictor, return_inverse=True)
+        codes = codes.ravel()
+        predictor_np = sparse.csr_matrix((np.ones(len(codes)), codes, np.arange(len(codes) + 1)),
+                                         shape=(len(codes), np.max(codes, initial=-1) + 1))
     elif column_type is CreditScoreCardColumnType.CONTINUOUS:
-        predictor_np = np.expand_dims(df['predictor'].to_numpy(), axis=1)
-    elif column_type is CreditScoreCardColumnType.BIN:
-        raise RuntimeError('not implemented')
+        predictor_np = np.expand_dims(predictor, axis=1)
     else:
         raise RuntimeError('Not supported column type')
 
-    response_np = df['response'].to_numpy()
-
     reg_model = LogisticRegression()
     reg_model.fit(predictor_np, response_np)
     predicted = reg_model.predict_proba(predictor_np)[:, 1]
 
-    metrics = get_model_metrics(prediction=predicted, actual=response_np)
+    # 'exact' metrics sort all predictions, 'histogram' metrics count them in score bins.
+    if kwargs.get('metrics', 'exact') == 'histogram':
+        metrics = get_streaming_model_metrics(prediction=predicted, actual=response_np)
+        metrics = {key: metrics[key] for key in ['accuracy', 'auroc', 'auroc_error_bound', 'ks']}
+    else:
+        metrics = get_model_metrics(prediction=predicted, actual=response_np)
     for metric in metrics.keys():
         result[metric] = metrics[metric]
 
     return result
 
 
+def _screen_column(predictor: np.ndarray, response: np.ndarray, column_type: CreditScoreCardColumnType,
+                   options: dict) -> dict:
+    start_time = time.perf_counter()
+    result = __screen_predictor(predictor, response, column_type=column_type, **options)
+    result['seconds'] = time.perf_counter() - start_time
+
+    return result
+
+
+def _screen_task(task) -> dict:
+    index, column_type, options = task
+    return _screen_column(_screen_values[index], _screen_values[-1], column_type, options)
+
+
+def __column_values(series: pd.Series, column_type: CreditScoreCardColumnType) -> np.ndarray:
+    if column_type is CreditScoreCardColumnType.CATEGORICAL:
+        codes, _ = pd.factorize(series, sort=True)
+        return np.where(codes < 0, np.nan, codes.astype(float))
+
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+
+def __screen_histogram(data, **kwargs) -> pd.DataFrame:
+    # data may also be an iterable of DataFrames or a CSV / Parquet path, read one chunk at a time.
+    chunks = iter_data_chunks(data, chunksize=kwargs.get('chunksize', 100000))
+    first_chunk = next(chunks)
+
+    # column types are inferred from the first chunk.
+    column_data = internal_process_columns(data=first_chunk, **kwargs)
+
+    screen = HistogramScreen(predictors=column_data['predictors'],
+                             column_types=column_data['column_types'],
+                             response=column_data['response'],
+                             bins=kwargs.get('bins', 20),
+                             bin_edges=kwargs.get('bin_edges', dict()))
+
+    screen.update(first_chunk)
+    for chunk in chunks:
+        screen.update(chunk)
+
+    return screen.results()
+
+
+@instrumented('consumer_credit.screen_predictors')
 def screen_predictors(data: pd.DataFrame, **kwargs):
+    # 'logistic' fits a univariate logistic regression per predictor,
+    # 'histogram' computes weight of evidence, information value and AUC from binned counts in one pass.
+    method: str = kwargs.get('method', 'logistic')
+
+    if method == 'histogram':
+        return __screen_histogram(data, **kwargs)
+
+    assert method == 'logistic'
+
     column_data = internal_process_columns(data=data, **kwargs)
 
     predictors = column_data['predictors']
     response = column_data['response']
     column_types = column_data['column_types']
 
-    rows: List[dict] = list()
-    response_series = data[response]
+    # predictors are screened in a process pool when workers > 1, sharing the data through a memory map.
+    # otherwise they are screened one column at a time, so only one predictor is held as floats.
+    workers: int = kwargs.get('workers', 1) or os.cpu_count() or 1
+    temp_dir: Optional[str] = kwargs.get('temp_dir')
+
+    shape = (len(predictors) + 1, len(data))
+    options = {
+        'binning_params': kwargs.get('binning_params', dict()),
+        'metrics': kwargs.get('metrics', 'exact')
+    }
+    tasks = [(i, column_types[i], options) for i in range(len(predictors))]
+
+    if workers <= 1:
+        response_values = __column_values(data[response], CreditScoreCardColumnType.CONTINUOUS)
+        rows: List[dict] = [_screen_column(__column_values(data[predictors[i]], column_types[i]), response_values,
+                                           column_types[i], options) for i in range(len(predictors))]
+    else:
+        handle, path = tempfile.mkstemp(suffix='.screen', dir=temp_dir)
+        os.close(handle)
+
+        try:
+            values = np.memmap(path, dtype=float, mode='w+', shape=shape)
+
+            for i in range(len(predictors)):
+                values[i] = __column_values(data[predictors[i]], column_types[i])
+            values[-1] = __column_values(data[response], CreditScoreCardColumnType.CONTINUOUS)
+
+            values.flush()
+            del values
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_screen_values,
+                                     initargs=(path, shape)) as executor:
+                rows: List[dict] = list(executor.map(_screen_task, tasks))
+        finally:
+            os.remove(path)
 
     for i in range(len(predictors)):
-        predictor = predictors[i]
-        row = __screen_predictor(data[predictor], response_series, column_type=column_types[i])
-        row['predictor'] = predictor
-        rows.append(row)
+        rows[i]['predictor'] = predictors[i]
+        # timed in the worker, so recorded here whether or not a process pool was used.
+        record('consumer_credit.screen_predictor[{}]'.format(predictors[i]), rows[i]['seconds'], len(data))
 
     results = pd.DataFrame(rows)
 
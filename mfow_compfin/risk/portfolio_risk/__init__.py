@@ -1,3 +1,4 @@
-from .sharpe import sharpe_ratio
+from .sharpe import sharpe_ratio, SharpeAccumulator
+from .simulation import PortfolioSimulator
 
-__all__ = ['sharpe_ratio']
+__all__ = ['sharpe_ratio', 'SharpeAccumulator', 'PortfolioSimulator']
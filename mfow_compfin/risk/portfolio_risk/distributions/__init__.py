@@ -1,5 +1,6 @@
 from .distribution import Distribution
-from .fitting import fit_distribution
+from .fitting import fit_distribution, fit_distributions
+from .rolling import rolling_risk
 
 
-__all__ = ['Distribution', 'fit_distribution']
+__all__ = ['Distribution', 'fit_distribution', 'fit_distributions', 'rolling_risk']
@@ -1,10 +1,17 @@
+import os
+import time
 import numpy as np
+import pandas as pd
 import scipy.stats as stats
+import scipy.optimize as optimize
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
 from .distribution import Distribution
 from .log_t_plus_risk import LogWithEntireInvestmentRiskDistribution
+from mfow_compfin.instrumentation import instrumented, count
 
 
-def fit_distribution(returns, **kwargs) -> Distribution:
+def _prepare_returns(returns) -> Tuple[np.ndarray, float]:
     if isinstance(returns, list):
         returns = np.array(returns)
 
@@ -29,10 +36,108 @@ def fit_distribution(returns, **kwargs) -> Distribution:
     # transform the returns with log.
     returns = np.log(1 + returns)
 
-    student_t_params = stats.t.fit(returns)
+    return returns, lose_entire_investment_pr
+
+
+def _fit_t(log_returns: np.ndarray, initial_params: Optional[Tuple[float, float, float]] = None):
+    diagnostics = dict()
+
+    # the default optimizer of rv_continuous.fit, keeping its convergence information.
+    def optimizer(func, x0, args=(), disp=0):
+        xopt, fopt, iterations, function_calls, warnflag = optimize.fmin(func, x0, args=args, disp=disp,
+                                                                         full_output=True)
+        diagnostics['neg_log_likelihood'] = fopt
+        diagnostics['iterations'] = iterations
+        diagnostics['function_calls'] = function_calls
+        diagnostics['converged'] = warnflag == 0
+        return xopt
+
+    if initial_params is None:
+        params = stats.t.fit(log_returns, optimizer=optimizer)
+    else:
+        df, loc, scale = initial_params
+        params = stats.t.fit(log_returns, df, loc=loc, scale=scale, optimizer=optimizer)
+
+    diagnostics['warm_start'] = initial_params is not None
+    return params, diagnostics
+
+
+@instrumented('distributions.fit_distribution', rows=lambda result, returns, **kwargs: len(returns))
+def fit_distribution(returns, **kwargs) -> Distribution:
+    returns, lose_entire_investment_pr = _prepare_returns(returns)
+
+    # optional (df, loc, scale) of a previous fit to start the optimizer from.
+    student_t_params, diagnostics = _fit_t(returns, kwargs.get('initial_params'))
+    count('distributions.fit_distribution', iterations=diagnostics['iterations'],
+          function_calls=diagnostics['function_calls'], not_converged=int(not diagnostics['converged']))
     student_t_model = stats.t(*student_t_params)
 
     return LogWithEntireInvestmentRiskDistribution(name=kwargs.get('name'),
                                                    model=student_t_model,
                                                    pr_lose_entire_investment=lose_entire_investment_pr)
 
+
+def _fit_series(task) -> tuple:
+    name, returns, initial_params = task
+
+    start_time = time.perf_counter()
+    log_returns, lose_entire_investment_pr = _prepare_returns(returns)
+    params, diagnostics = _fit_t(log_returns, initial_params)
+
+    diagnostics['observations'] = len(log_returns)
+    diagnostics['seconds'] = time.perf_counter() - start_time
+
+    return name, tuple(params), lose_entire_investment_pr, diagnostics
+
+
+def fit_distributions(returns, **kwargs) -> Tuple[Dict[str, Distribution], pd.DataFrame]:
+    # a (observations x series) matrix or DataFrame, or a dict of return series.
+    if isinstance(returns, dict):
+        series = [(name, np.asarray(values, dtype=float)) for name, values in returns.items()]
+    elif isinstance(returns, pd.DataFrame):
+        series = [(name, returns[name].to_numpy(dtype=float)) for name in returns.columns]
+    else:
+        returns = np.asarray(returns, dtype=float)
+        assert len(returns.shape) == 2
+        names = kwargs.get('names', list(range(returns.shape[1])))
+        assert len(names) == returns.shape[1]
+        series = [(names[i], returns[:, i]) for i in range(returns.shape[1])]
+
+    # previous fits, as distributions or (df, loc, scale), keyed by series name.
+    initial_params: dict = kwargs.get('initial_params', dict())
+
+    tasks = list()
+    for name, values in series:
+        params = initial_params.get(name)
+        if isinstance(params, LogWithEntireInvestmentRiskDistribution):
+            params = params.t_params
+        tasks.append((name, values, params))
+
+    workers: int = kwargs.get('workers', 1) or os.cpu_count() or 1
+    chunksize: int = kwargs.get('chunksize', max(1, len(tasks) // (4 * workers)))
+
+    # every fit is independent and deterministic, so results do not depend on the number of workers.
+    if workers <= 1:
+        results = list(map(_fit_series, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fit_series, tasks, chunksize=chunksize))
+
+    distributions: Dict[str, Distribution] = dict()
+    rows = list()
+
+    for name, params, lose_entire_investment_pr, diagnostics in results:
+        distributions[name] = LogWithEntireInvestmentRiskDistribution(name=name,
+                                                                      model=stats.t(*params),
+                                                                      pr_lose_entire_investment=lose_entire_investment_pr)
+        row = {
+            'name': name,
+            'df': params[0],
+            'loc': params[1],
+            'scale': params[2],
+            'pr_lose_entire_investment': lose_entire_investment_pr
+        }
+        row.update(diagnostics)
+        rows.append(row)
+
+    return distributions, pd.DataFrame(rows).set_index('name')
@@ -2,6 +2,8 @@ import numpy as np
 import scipy.stats as stats
 from abc import ABC, abstractmethod
 from .distribution import Distribution
+from .tabulated import TabulatedLogWithEntireInvestmentRiskDistribution
+from mfow_compfin.persistence import save_artifact, load_artifact
 
 
 # a model for a distribution of returns
@@ -9,8 +11,31 @@ from .distribution import Distribution
 # and for other cases, a log(students t) distribution
 class LogWithEntireInvestmentRiskDistribution(Distribution):
     def __init__(self, **kwargs):
+        super(LogWithEntireInvestmentRiskDistribution, self).__init__(**kwargs)
         self.model = kwargs.get('model')
         self.pr_lose_entire_investment = kwargs.get('pr_lose_entire_investment')
+        self.__tables = dict()
+
+    @property
+    def t_params(self):
+        # (df, loc, scale) of the student's t model of the log returns.
+        args = list(self.model.args)
+        kwds = self.model.kwds
+        df = args[0] if len(args) > 0 else kwds['df']
+        loc = args[1] if len(args) > 1 else kwds.get('loc', 0.0)
+        scale = args[2] if len(args) > 2 else kwds.get('scale', 1.0)
+        return df, loc, scale
+
+    def tabulate(self, tolerance: float = 1e-6) -> TabulatedLogWithEntireInvestmentRiskDistribution:
+        # the table is built once per tolerance and kept with the fitted distribution.
+        if tolerance not in self.__tables:
+            self.__tables[tolerance] = TabulatedLogWithEntireInvestmentRiskDistribution(
+                name=self.name,
+                model=self.model,
+                pr_lose_entire_investment=self.pr_lose_entire_investment,
+                tolerance=tolerance)
+
+        return self.__tables[tolerance]
 
     def inv_cdf(self, p):
         y = p
@@ -47,10 +72,41 @@ class LogWithEntireInvestmentRiskDistribution(Distribution):
         assert len(y.shape) == 1
 
         y_log = np.log(y + 1.0)
-        pr = self.model.cdf(y_log)
+        pr = self.pr_lose_entire_investment + (1.0 - self.pr_lose_entire_investment) * self.model.cdf(y_log)
         pr[y <= -1] = self.pr_lose_entire_investment
 
         if isinstance(x, float):
             return pr[0]
 
         return pr
+
+    def _tail_mean(self, p: np.ndarray, nodes: int) -> np.ndarray:
+        # returns are -1 with probability pr_lose_entire_investment, and exp(t) - 1 above it,
+        # so the mean over [0, p] is -1 plus the integral of exp(ppf) over the continuous part of the tail.
+        pr_lose = self.pr_lose_entire_investment
+        q = np.maximum(p - pr_lose, 0.0) / (1.0 - pr_lose)
+
+        u, w = self._tail_nodes(nodes)
+        v = q[:, np.newaxis] * u[np.newaxis, :]
+        integral = q * (np.exp(self.model.ppf(v)) @ w)
+
+        return (1.0 - pr_lose) * integral / p - 1.0
+
+    def save(self, path: str):
+        df, loc, scale = self.t_params
+        save_artifact(path,
+                      kind='LogWithEntireInvestmentRiskDistribution',
+                      meta={
+                          'name': self.name,
+                          'df': float(df),
+                          'loc': float(loc),
+                          'scale': float(scale),
+                          'pr_lose_entire_investment': float(self.pr_lose_entire_investment)
+                      })
+
+    @staticmethod
+    def load(path: str) -> 'LogWithEntireInvestmentRiskDistribution':
+        meta = load_artifact(path, kind='LogWithEntireInvestmentRiskDistribution')['meta']
+        return LogWithEntireInvestmentRiskDistribution(name=meta['name'],
+                                                       model=stats.t(meta['df'], meta['loc'], meta['scale']),
+                                                       pr_lose_entire_investment=meta['pr_lose_entire_investment'])
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Union
+from .fitting import _fit_t
+from .log_t_plus_risk import LogWithEntireInvestmentRiskDistribution
+
+
+def _rolling_series(task) -> pd.DataFrame:
+    name, returns, index, window, step, levels, min_observations = task
+
+    assert len(returns.shape) == 1
+    assert np.all(np.isnan(returns) | (returns >= -1))
+
+    # filter and transform the whole history once, windows are then slices of it.
+    valid = np.logical_not(np.isnan(returns))
+    lost = returns == -1
+    kept = valid & np.logical_not(lost)
+
+    log_returns = np.full(len(returns), np.nan)
+    log_returns[kept] = np.log(1 + returns[kept])
+
+    valid_count = np.concatenate([[0], np.cumsum(valid)])
+    lost_count = np.concatenate([[0], np.cumsum(lost)])
+
+    rows = list()
+    params = None
+
+    for end in range(window, len(returns) + 1, step):
+        start = end - window
+        num_valid = valid_count[end] - valid_count[start]
+        num_lost = lost_count[end] - lost_count[start]
+
+        row = {'end': index[end - 1], 'observations': num_valid}
+
+        window_returns = log_returns[start:end][kept[start:end]]
+        if len(window_returns) < min_observations:
+            rows.append(row)
+            continue
+
+        # each window starts the optimizer from the previous window's fit.
+        params, diagnostics = _fit_t(window_returns, params)
+
+        distribution = LogWithEntireInvestmentRiskDistribution(name=name,
+                                                               model=stats.t(*params),
+                                                               pr_lose_entire_investment=num_lost / num_valid)
+        value_at_risk = distribution.inv_cdf(levels) * -1.0
+        conditional_value_at_risk = distribution.conditional_value_at_risk(levels)
+
+        row['df'], row['loc'], row['scale'] = params
+        row['pr_lose_entire_investment'] = distribution.pr_lose_entire_investment
+        row['converged'] = diagnostics['converged']
+        row['iterations'] = diagnostics['iterations']
+
+        for i, level in enumerate(levels):
+            row['value_at_risk_{:g}'.format(level)] = value_at_risk[i]
+            row['conditional_value_at_risk_{:g}'.format(level)] = conditional_value_at_risk[i]
+
+        rows.append(row)
+
+    # the columns are given, so a series shorter than the window (no rows) or without a fitted window
+    # still has them.
+    columns = ['end', 'observations', 'df', 'loc', 'scale', 'pr_lose_entire_investment', 'converged', 'iterations']
+    for level in levels:
+        columns += ['value_at_risk_{:g}'.format(level), 'conditional_value_at_risk_{:g}'.format(level)]
+
+    return pd.DataFrame(rows, columns=columns).set_index('end')
+
+
+def rolling_risk(returns, **kwargs) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    window: int = kwargs.get('window')
+    step: int = kwargs.get('step', 1)
+    levels = np.atleast_1d(np.asarray(kwargs.get('p', 0.05), dtype=float))
+    min_observations: int = kwargs.get('min_observations', 5)
+
+    assert window is not None and window >= min_observations
+    assert step >= 1
+    assert np.all((0.0 < levels) & (levels < 1.0))
+
+    # a single series gives one frame, a DataFrame or dict of series gives one frame per series.
+    single = False
+    if isinstance(returns, dict):
+        series = [(name, pd.Series(values)) for name, values in returns.items()]
+    elif isinstance(returns, pd.DataFrame):
+        series = [(name, returns[name]) for name in returns.columns]
+    else:
+        single = True
+        series = [(kwargs.get('name'), pd.Series(returns) if not isinstance(returns, pd.Series) else returns)]
+
+    tasks = [(name, values.to_numpy(dtype=float), values.index.to_numpy(), window, step, levels, min_observations)
+             for name, values in series]
+
+    workers: int = kwargs.get('workers', 1) or os.cpu_count() or 1
+
+    if workers <= 1 or len(tasks) == 1:
+        results = list(map(_rolling_series, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_rolling_series, tasks))
+
+    if single:
+        return results[0]
+
+    return {name: result for (name, _), result in zip(series, results)}
@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from typing import Optional
+from .distribution import Distribution
+
+
+# a log(students t) distribution with a point mass at -1 (see LogWithEntireInvestmentRiskDistribution),
+# where the quantile function of the t part is replaced by linear interpolation in a table.
+# the table is uniform in logit(probability), so it is dense in both tails and needs no search to index.
+class TabulatedLogWithEntireInvestmentRiskDistribution(Distribution):
+    def __init__(self, **kwargs):
+        super(TabulatedLogWithEntireInvestmentRiskDistribution, self).__init__(**kwargs)
+        self.model = kwargs.get('model')
+        self.pr_lose_entire_investment: float = kwargs.get('pr_lose_entire_investment')
+
+        # the maximum error allowed between table nodes, relative to 1 + return
+        # (so an absolute error in returns near zero, where most of the mass is).
+        self.tolerance: float = kwargs.get('tolerance', 1e-6)
+        # probabilities of the t part below tail_probability or above 1 - tail_probability use the exact model.
+        self.tail_probability: float = kwargs.get('tail_probability', 1e-10)
+        min_nodes: int = kwargs.get('min_nodes', 1024)
+        max_nodes: int = kwargs.get('max_nodes', 2 ** 22)
+
+        assert self.tolerance > 0.0
+        assert 0.0 < self.tail_probability < 0.5
+        assert 2 <= min_nodes <= max_nodes
+
+        start_time = time.perf_counter()
+
+        self.logit_limit: float = np.log(1.0 - self.tail_probability) - np.log(self.tail_probability)
+
+        # double the table until the error at the midpoints between nodes is within tolerance.
+        nodes = min_nodes
+        while True:
+            logits = np.linspace(-self.logit_limit, self.logit_limit, nodes)
+            log_returns = self.__exact_t_ppf(logits)
+
+            mid_logits = (logits[1:] + logits[:-1]) / 2.0
+            exact = np.exp(self.__exact_t_ppf(mid_logits))
+            interpolated = np.exp((log_returns[1:] + log_returns[:-1]) / 2.0)
+            max_error = np.max(np.abs(interpolated / exact - 1.0))
+
+            if max_error <= self.tolerance or nodes >= max_nodes:
+                break
+
+            nodes = min(nodes * 2, max_nodes)
+
+        self.logits: np.ndarray = logits
+        self.log_returns: np.ndarray = log_returns
+        self.__log_return_steps = np.diff(log_returns)
+        self.__logit_step = logits[1] - logits[0]
+
+        self.info: dict = {
+            'nodes': nodes,
+            'max_error': max_error,
+            'tolerance': self.tolerance,
+            'nbytes': logits.nbytes + log_returns.nbytes,
+            'build_seconds': time.perf_counter() - start_time
+        }
+
+    @staticmethod
+    def __expit(z: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def __exact_t_ppf(self, logits: np.ndarray) -> np.ndarray:
+        # the upper half goes through isf so that probabilities close to 1 keep their precision.
+        return np.where(logits <= 0.0, self.model.ppf(self.__expit(logits)), self.model.isf(self.__expit(-logits)))
+
+    def __t_ppf(self, v: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logits = np.log(v) - np.log1p(-v)
+            inside = np.abs(logits) <= self.logit_limit
+            position = np.where(inside, (logits + self.logit_limit) / self.__logit_step, 0.0)
+
+        index = np.clip(position.astype(np.int64), 0, len(self.logits) - 2)
+        result = self.log_returns[index] + (position - index) * self.__log_return_steps[index]
+
+        outside = np.logical_not(inside)
+        if np.any(outside):
+            result[outside] = self.model.ppf(v[outside])
+
+        return result
+
+    def __t_cdf(self, log_returns: np.ndarray) -> np.ndarray:
+        inside = (self.log_returns[0] <= log_returns) & (log_returns <= self.log_returns[-1])
+        result = self.__expit(np.interp(log_returns, self.log_returns, self.logits))
+
+        outside = np.logical_not(inside)
+        if np.any(outside):
+            result[outside] = self.model.cdf(log_returns[outside])
+
+        return result
+
+    def inv_cdf(self, p):
+        y = np.asarray(p, dtype=float)
+        scalar = len(y.shape) == 0
+        y = np.atleast_1d(y)
+
+        assert np.min(y) >= 0
+        assert np.max(y) <= 1
+
+        v = (y - self.pr_lose_entire_investment) / (1.0 - self.pr_lose_entire_investment)
+        lost = y <= self.pr_lose_entire_investment
+        v[lost] = 0.5
+
+        result = np.exp(self.__t_ppf(v)) - 1.0
+        result[lost] = -1
+
+        if scalar:
+            return result[0]
+
+        return result
+
+    def cdf(self, x):
+        y = np.asarray(x, dtype=float)
+        scalar = len(y.shape) == 0
+        y = np.atleast_1d(y)
+
+        lost = y <= -1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_log = np.log(np.where(lost, 1.0, y + 1.0))
+
+        pr = self.pr_lose_entire_investment + (1.0 - self.pr_lose_entire_investment) * self.__t_cdf(y_log)
+        pr[lost] = self.pr_lose_entire_investment
+
+        if scalar:
+            return pr[0]
+
+        return pr
+
+    def _tail_mean(self, p: np.ndarray, nodes: int) -> np.ndarray:
+        # as LogWithEntireInvestmentRiskDistribution, with the tabulated quantile function.
+        pr_lose = self.pr_lose_entire_investment
+        q = np.maximum(p - pr_lose, 0.0) / (1.0 - pr_lose)
+
+        u, w = self._tail_nodes(nodes)
+        v = q[:, np.newaxis] * u[np.newaxis, :]
+        integral = q * (np.exp(self.__t_ppf(v.ravel())).reshape(v.shape) @ w)
+
+        return (1.0 - pr_lose) * integral / p - 1.0
+
+    def benchmark(self, n: int = 1000000, seed: Optional[int] = 0) -> dict:
+        # time and compare the table against the exact quantile function on the same uniforms.
+        u = np.random.default_rng(seed).random(n)
+        v = (u - self.pr_lose_entire_investment) / (1.0 - self.pr_lose_entire_investment)
+        v = v[v > 0.0]
+
+        start_time = time.perf_counter()
+        exact = np.exp(self.model.ppf(v)) - 1.0
+        exact_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        tabulated = np.exp(self.__t_ppf(v)) - 1.0
+        tabulated_seconds = time.perf_counter() - start_time
+
+        return {
+            'draws': len(v),
+            'exact_seconds': exact_seconds,
+            'tabulated_seconds': tabulated_seconds,
+            'speedup': exact_seconds / tabulated_seconds if tabulated_seconds > 0 else np.inf,
+            'max_error': float(np.max(np.abs((tabulated + 1.0) / (exact + 1.0) - 1.0))) if len(v) > 0 else 0.0
+        }
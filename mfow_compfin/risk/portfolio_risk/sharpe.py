@@ -1,11 +1,17 @@
 import numpy as np
+from typing import Optional, Union
 
 
-def sharpe_ratio(**kwargs) -> float:
+def sharpe_ratio(**kwargs) -> Union[float, np.ndarray]:
     asset_returns: np.ndarray = kwargs.get('asset_returns')
     asset_return: float = kwargs.get('asset_return')
     asset_std_dev: float = kwargs.get('asset_std_dev')
 
+    # the number of return periods in a year, to annualise the per-period ratio.
+    periods_per_year: Optional[float] = kwargs.get('periods_per_year')
+
+    risk_free_return: Union[float, np.ndarray] = kwargs.get('risk_free_return')
+
     if asset_returns is None:
         assert asset_return is not None
         assert asset_std_dev is not None
@@ -16,14 +22,116 @@ def sharpe_ratio(**kwargs) -> float:
         if isinstance(asset_returns, list):
             asset_returns = np.array(asset_returns)
 
+        if len(asset_returns.shape) == 2:
+            # (periods x assets), ignoring missing returns per asset.
+            return __sharpe_ratio_matrix(asset_returns, risk_free_return, periods_per_year)
+
         assert len(asset_returns.shape) == 1
-        asset_return = np.mean(asset_returns)
-        asset_std_dev = np.std(asset_std_dev)
+        asset_return = np.nanmean(asset_returns)
+        asset_std_dev = np.nanstd(asset_returns)
 
     assert asset_std_dev > 0.0
 
-    risk_free_return: float = kwargs.get('risk_free_return')
-
     expected_excess = asset_return - risk_free_return
-    return expected_excess / asset_std_dev
+    result = expected_excess / asset_std_dev
+
+    if periods_per_year is not None:
+        result *= np.sqrt(periods_per_year)
+
+    return result
+
+
+def __sharpe_ratio_matrix(asset_returns: np.ndarray, risk_free_return: Union[float, np.ndarray],
+                          periods_per_year: Optional[float]) -> np.ndarray:
+    risk_free_return = np.asarray(risk_free_return, dtype=float)
+    assert risk_free_return.shape in [(), (asset_returns.shape[1],)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        asset_return = np.nanmean(asset_returns, axis=0)
+        asset_std_dev = np.nanstd(asset_returns, axis=0)
+        result = (asset_return - risk_free_return) / asset_std_dev
+
+    # assets without any variation in returns have no defined ratio.
+    result[np.logical_not(asset_std_dev > 0.0)] = np.nan
+
+    if periods_per_year is not None:
+        result *= np.sqrt(periods_per_year)
+
+    return result
+
+
+class SharpeAccumulator:
+    # running mean and variance of returns per asset (Welford / Chan et al.),
+    # which can be fed one observation or one chunk at a time and merged across workers.
+    def __init__(self, **kwargs):
+        self.num_assets: int = kwargs.get('num_assets', 1)
+        assert self.num_assets >= 1
+
+        self.count: np.ndarray = np.zeros(self.num_assets)
+        self.mean: np.ndarray = np.zeros(self.num_assets)
+        self.m2: np.ndarray = np.zeros(self.num_assets)
+
+    def __combine(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray):
+        total = self.count + count
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / total, 0.0)
+            self.mean = self.mean + delta * weight
+            self.m2 = self.m2 + m2 + delta * delta * self.count * weight
+
+        self.count = total
+
+    def update(self, returns):
+        # a (periods x assets) chunk, one observation per asset, or a series when there is one asset.
+        returns = np.asarray(returns, dtype=float)
+
+        if len(returns.shape) == 0:
+            returns = returns.reshape(1, 1)
+        elif len(returns.shape) == 1:
+            returns = returns[:, np.newaxis] if self.num_assets == 1 else returns[np.newaxis, :]
+
+        assert len(returns.shape) == 2
+        assert returns.shape[1] == self.num_assets
+
+        valid = np.logical_not(np.isnan(returns))
+        count = np.sum(valid, axis=0).astype(float)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(returns, axis=0) / count, 0.0)
+
+        deviation = np.where(valid, returns - mean, 0.0)
+        m2 = np.sum(deviation * deviation, axis=0)
+
+        self.__combine(count, mean, m2)
+        return self
+
+    def merge(self, other: 'SharpeAccumulator'):
+        assert isinstance(other, SharpeAccumulator)
+        assert other.num_assets == self.num_assets
+
+        self.__combine(other.count, other.mean, other.m2)
+        return self
+
+    def std_dev(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self.m2 / self.count)
+
+    def sharpe_ratio(self, **kwargs) -> Union[float, np.ndarray]:
+        risk_free_return: Union[float, np.ndarray] = kwargs.get('risk_free_return')
+        periods_per_year: Optional[float] = kwargs.get('periods_per_year')
+
+        std_dev = self.std_dev()
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = (self.mean - np.asarray(risk_free_return, dtype=float)) / std_dev
+
+        result[np.logical_not(std_dev > 0.0)] = np.nan
+
+        if periods_per_year is not None:
+            result *= np.sqrt(periods_per_year)
+
+        if self.num_assets == 1:
+            return float(result[0])
 
+        return result
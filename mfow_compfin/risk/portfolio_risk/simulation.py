@@ -0,0 +1,184 @@
+import os
+import numpy as np
+import scipy.stats as stats
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+from .distributions import Distribution
+
+
+# simulator used by the current worker process, set by _init_worker.
+_worker_simulator = None
+
+
+def _init_worker(simulator):
+    global _worker_simulator
+    _worker_simulator = simulator
+
+
+def _simulate_chunk_statistics(task) -> dict:
+    chunk_index, paths, levels, tail_size = task
+    returns = _worker_simulator.simulate_chunk(chunk_index, paths)
+
+    # the tail_size smallest returns of the chunk, merged over chunks into the overall tail,
+    # and per chunk tail estimates for the batch-means standard errors.
+    result = {
+        'paths': paths,
+        'sum': np.sum(returns),
+        'sum_squares': np.sum(returns * returns),
+        'tail': _smallest(returns, tail_size),
+        'value_at_risk': np.empty(len(levels)),
+        'conditional_value_at_risk': np.empty(len(levels))
+    }
+
+    for i, level in enumerate(levels):
+        result['value_at_risk'][i], result['conditional_value_at_risk'][i] = _tail_risk(result['tail'], level, paths)
+
+    return result
+
+
+def _smallest(values: np.ndarray, k: int, sort: bool = True) -> np.ndarray:
+    # the k smallest values, sorted unless sort is False.
+    if len(values) > k:
+        values = np.partition(values, k - 1)[:k]
+    return np.sort(values) if sort else values
+
+
+def _tail_risk(tail: np.ndarray, level: float, paths: int) -> tuple:
+    # value at risk and conditional value at risk at level from the sorted smallest returns of paths paths.
+    k = max(int(np.ceil(level * paths)), 1)
+    return -tail[k - 1], -np.mean(tail[:k])
+
+
+class PortfolioSimulator:
+    def __init__(self, **kwargs):
+        self.distributions: List[Distribution] = kwargs.get('distributions')
+        self.correlation: np.ndarray = np.asarray(kwargs.get('correlation'), dtype=float)
+        self.weights: np.ndarray = np.asarray(kwargs.get('weights'), dtype=float)
+
+        # 'gaussian' or 't'
+        self.copula: str = kwargs.get('copula', 'gaussian')
+        self.copula_df: Optional[float] = kwargs.get('copula_df')
+
+        self.chunk_size: int = kwargs.get('chunk_size', 10000)
+        self.seed: int = kwargs.get('seed', 0)
+        # the most tail returns (ceil(max(p) * paths)) simulate keeps for exact value at risk. the tail buffer
+        # holds at most three times this many floats, 384 MiB by default, whatever the number of chunks.
+        self.max_tail_size: int = kwargs.get('max_tail_size', 2 ** 24)
+
+        num_assets = len(self.distributions)
+        assert num_assets >= 1
+        for distribution in self.distributions:
+            assert isinstance(distribution, Distribution)
+
+        assert self.correlation.shape == (num_assets, num_assets)
+        assert np.allclose(self.correlation, self.correlation.T)
+        assert np.allclose(np.diag(self.correlation), 1.0)
+        assert self.weights.shape == (num_assets,)
+        assert self.copula in ['gaussian', 't']
+        if self.copula == 't':
+            assert self.copula_df is not None and self.copula_df > 0
+
+        assert self.chunk_size >= 1
+        assert self.max_tail_size >= 1
+
+        self.cholesky: np.ndarray = np.linalg.cholesky(self.correlation)
+
+    def simulate_chunk(self, chunk_index: int, paths: int) -> np.ndarray:
+        # each chunk draws from its own stream, so the paths do not depend on how chunks are spread over workers.
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(chunk_index,)))
+
+        z = rng.standard_normal((paths, len(self.distributions))) @ self.cholesky.T
+
+        if self.copula == 't':
+            w = rng.chisquare(self.copula_df, (paths, 1)) / self.copula_df
+            u = stats.t.cdf(z / np.sqrt(w), self.copula_df)
+        else:
+            u = stats.norm.cdf(z)
+
+        # keep the uniforms strictly inside (0, 1) so the marginal quantiles are finite.
+        eps = np.finfo(float).eps
+        u = np.clip(u, eps, 1.0 - eps)
+
+        returns = np.zeros(paths)
+        for j, distribution in enumerate(self.distributions):
+            if self.weights[j] != 0.0:
+                returns += self.weights[j] * distribution.inv_cdf(u[:, j])
+
+        return returns
+
+    def __chunks(self, paths: int) -> List[tuple]:
+        assert paths >= 1
+        num_chunks = int(np.ceil(paths / self.chunk_size))
+        return [(i, min(self.chunk_size, paths - i * self.chunk_size)) for i in range(num_chunks)]
+
+    def iter_paths(self, paths: int) -> Iterator[np.ndarray]:
+        # portfolio returns, at most chunk_size paths at a time.
+        for chunk_index, chunk_paths in self.__chunks(paths):
+            yield self.simulate_chunk(chunk_index, chunk_paths)
+
+    def simulate(self, paths: int, **kwargs) -> dict:
+        levels = np.atleast_1d(np.asarray(kwargs.get('p', 0.05), dtype=float))
+        assert np.all((0.0 < levels) & (levels < 1.0))
+
+        workers: int = kwargs.get('workers', 1) or os.cpu_count() or 1
+        # value at risk and conditional value at risk are computed once from the tail_size smallest returns
+        # over all paths, so they do not depend on chunk_size. chunk tails are buffered and cut back to the
+        # tail_size smallest only when the buffer passes twice that, so merging is linear in the paths.
+        tail_size = max(int(np.ceil(np.max(levels) * paths)), 1)
+        if tail_size > self.max_tail_size:
+            raise ValueError('Exact value at risk at p={} over {} paths keeps {} tail returns, more than '
+                             'max_tail_size={}.'.format(np.max(levels), paths, tail_size, self.max_tail_size))
+
+        tasks = [(chunk_index, chunk_paths, levels, tail_size) for chunk_index, chunk_paths in self.__chunks(paths)]
+
+        chunks: List[dict] = list()
+        tail_parts: List[np.ndarray] = list()
+        buffered = 0
+
+        def merge(chunk: dict):
+            nonlocal tail_parts, buffered
+            tail_parts.append(chunk.pop('tail'))
+            buffered += len(tail_parts[-1])
+            if buffered > 2 * tail_size:
+                tail_parts = [_smallest(np.concatenate(tail_parts), tail_size, sort=False)]
+                buffered = len(tail_parts[0])
+            chunks.append(chunk)
+
+        if workers <= 1:
+            _init_worker(self)
+            for chunk in map(_simulate_chunk_statistics, tasks):
+                merge(chunk)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                for chunk in executor.map(_simulate_chunk_statistics, tasks,
+                                          chunksize=max(1, len(tasks) // (4 * workers))):
+                    merge(chunk)
+
+        tail = _smallest(np.concatenate(tail_parts), tail_size)
+        del tail_parts
+
+        total_paths = sum(chunk['paths'] for chunk in chunks)
+        mean = sum(chunk['sum'] for chunk in chunks) / total_paths
+        variance = sum(chunk['sum_squares'] for chunk in chunks) / total_paths - mean * mean
+
+        result = {
+            'paths': total_paths,
+            'p': levels,
+            'mean': mean,
+            'std': np.sqrt(max(variance, 0.0))
+        }
+
+        tail_risk = np.array([_tail_risk(tail, level, total_paths) for level in levels]).reshape(len(levels), 2)
+        result['value_at_risk'] = tail_risk[:, 0]
+        result['conditional_value_at_risk'] = tail_risk[:, 1]
+
+        # batch-means standard errors from the per chunk estimates.
+        for key in ['value_at_risk', 'conditional_value_at_risk']:
+            estimates = np.array([chunk[key] for chunk in chunks])
+
+            if len(chunks) > 1:
+                result[key + '_se'] = np.std(estimates, axis=0, ddof=1) / np.sqrt(len(chunks))
+            else:
+                result[key + '_se'] = np.full(len(levels), np.nan)
+
+        return result
@@ -1,7 +1,8 @@
 from .interest import discount_rate, yield_rate
 from .yield_curve import YieldCurve
+from .yield_curve_set import YieldCurveSet, parallel_shifts, twist_shifts, key_rate_shifts
 from .yield_calendar import YieldCalendar, MonthlyYieldCalendar
 
 
-__all__ = ['discount_rate', 'yield_rate', 'YieldCurve', 'YieldCalendar', 'MonthlyYieldCalendar']
-
+__all__ = ['discount_rate', 'yield_rate', 'YieldCurve', 'YieldCurveSet', 'parallel_shifts', 'twist_shifts',
+           'key_rate_shifts', 'YieldCalendar', 'MonthlyYieldCalendar']
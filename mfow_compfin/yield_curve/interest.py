@@ -33,3 +33,72 @@ def interpolate_rate(**kwargs) -> float:
 
     assert min(first_rate, next_rate) <= yr <= max(first_rate, next_rate)
     return yr
+
+
+def interpolate_rates(**kwargs) -> np.ndarray:
+    # element-wise version of interpolate_rate, also used to extrapolate beyond the last segment.
+    first_period: np.ndarray = np.asarray(kwargs.get('first_period'), dtype=float)
+    next_period: np.ndarray = np.asarray(kwargs.get('next_period'), dtype=float)
+    extrapolate_period: np.ndarray = np.asarray(kwargs.get('extrapolate_period'), dtype=float)
+    first_rate: np.ndarray = np.asarray(kwargs.get('first_rate'), dtype=float)
+    next_rate: np.ndarray = np.asarray(kwargs.get('next_rate'), dtype=float)
+
+    first_discount = discount_rate(first_rate, first_period)
+    next_discount = discount_rate(next_rate, next_period)
+    assert np.all(next_discount > 0.0)
+
+    second_discount = next_discount / first_discount
+    second_periods = next_period - first_period
+
+    extrapolated_discount = first_discount * np.power(second_discount, (extrapolate_period - first_period) / second_periods)
+    yr = yield_rate(extrapolated_discount, extrapolate_period)
+
+    return np.where(first_rate == next_rate, first_rate, yr)
+
+
+def interpolate_curve(**kwargs) -> np.ndarray:
+    # rates for the given periods on a curve with knots at `periods`.
+    # `rates` may hold one curve (K,) or many curves over the same knots (S, K),
+    # in which case the result has shape (S, *period.shape).
+    periods: np.ndarray = kwargs.get('periods')
+    rates: np.ndarray = kwargs.get('rates')
+    period: np.ndarray = kwargs.get('period')
+    periods_per_year: float = float(kwargs.get('periods_per_year'))
+    allow_prior_extrapolation: bool = kwargs.get('allow_prior_extrapolation')
+    allow_post_extrapolation: bool = kwargs.get('allow_post_extrapolation')
+    allow_extrapolation: bool = kwargs.get('allow_extrapolation', True)
+
+    result = np.empty(rates.shape[:-1] + period.shape, dtype=float)
+
+    # index of the highest knot at or before each period, -1 if before the first knot.
+    prior_index = np.searchsorted(periods, period, side='right') - 1
+    on_knot = (prior_index >= 0) & (periods[np.maximum(prior_index, 0)] == period)
+
+    # period 0 has a rate of 0 on every curve, so it is never extrapolated.
+    zero = period == 0
+    prior = (prior_index < 0) & ~zero
+    if np.any(prior):
+        assert allow_prior_extrapolation
+        result[..., prior] = rates[..., :1]
+
+    result[..., on_knot] = rates[..., prior_index[on_knot]]
+
+    between = ~(prior | on_knot | zero)
+    if np.any(between):
+        assert allow_extrapolation
+
+        first_index = prior_index[between]
+        post = first_index == len(periods) - 1
+        if np.any(post):
+            assert allow_post_extrapolation
+            assert len(periods) >= 2
+            first_index = np.where(post, first_index - 1, first_index)
+
+        result[..., between] = interpolate_rates(first_period=periods[first_index] / periods_per_year,
+                                                 next_period=periods[first_index + 1] / periods_per_year,
+                                                 first_rate=rates[..., first_index],
+                                                 next_rate=rates[..., first_index + 1],
+                                                 extrapolate_period=period[between] / periods_per_year)
+
+    result[..., zero] = 0.0
+    return result
@@ -0,0 +1,115 @@
+import functools
+import threading
+from typing import Callable, Hashable, Optional
+from mfow_compfin.instrumentation import stats
+
+
+class RateCache:
+    # lookup(key) returns compute(key), cached per instance. a hit is a single call into functools.lru_cache
+    # for 'lru' and a dict lookup for 'fifo': the lock, eviction and miss counting only happen on a miss.
+    def __init__(self, **kwargs):
+        self.compute: Callable = kwargs.get('compute')
+        # None for an unbounded cache, 0 to disable caching.
+        self.maxsize: Optional[int] = kwargs.get('maxsize', 128)
+        # 'lru' evicts the least recently used entry, 'fifo' the oldest inserted.
+        self.eviction: str = kwargs.get('eviction', 'lru')
+
+        assert callable(self.compute)
+        assert self.maxsize is None or self.maxsize >= 0
+        assert self.eviction in ['lru', 'fifo']
+
+        self.__lock = threading.Lock()
+        # counts from before the last clear, as clearing an lru_cache also resets its counts.
+        self.__cleared = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        if self.eviction == 'lru':
+            self.lookup: Callable = functools.lru_cache(maxsize=self.maxsize)(self.compute)
+        else:
+            self.__entries = dict()
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+            self.lookup: Callable = self.__lookup_fifo
+
+    def __lookup_fifo(self, key: Hashable):
+        try:
+            value = self.__entries[key]
+        except KeyError:
+            return self.__miss_fifo(key)
+
+        self.__hits += 1
+        return value
+
+    def __miss_fifo(self, key: Hashable):
+        value = self.compute(key)
+
+        with self.__lock:
+            self.__misses += 1
+            if self.maxsize == 0:
+                return value
+
+            self.__entries[key] = value
+            if self.maxsize is not None:
+                while len(self.__entries) > self.maxsize:
+                    del self.__entries[next(iter(self.__entries))]
+                    self.__evictions += 1
+
+        return value
+
+    def counted_lookup(self, key: Hashable):
+        # lookup, with the hit or miss counted by instrumentation. only used while instrumentation is enabled.
+        misses = self.__counts()['misses']
+        value = self.lookup(key)
+        if self.__counts()['misses'] > misses:
+            stats.count('yield_curve.rate_cache', misses=1)
+        else:
+            stats.count('yield_curve.rate_cache', hits=1)
+        return value
+
+    def __counts(self) -> dict:
+        if self.eviction == 'lru':
+            info = self.lookup.cache_info()
+            # an lru_cache that holds fewer entries than it missed has evicted the difference.
+            evictions = info.misses - info.currsize if self.maxsize != 0 else 0
+            return {'hits': info.hits, 'misses': info.misses, 'evictions': evictions, 'size': info.currsize}
+
+        return {'hits': self.__hits, 'misses': self.__misses, 'evictions': self.__evictions,
+                'size': len(self.__entries)}
+
+    def __len__(self) -> int:
+        return self.__counts()['size']
+
+    @property
+    def hits(self) -> int:
+        return self.__cleared['hits'] + self.__counts()['hits']
+
+    @property
+    def misses(self) -> int:
+        return self.__cleared['misses'] + self.__counts()['misses']
+
+    @property
+    def evictions(self) -> int:
+        return self.__cleared['evictions'] + self.__counts()['evictions']
+
+    def clear(self):
+        with self.__lock:
+            if self.eviction == 'lru':
+                counts = self.__counts()
+                for key in self.__cleared.keys():
+                    self.__cleared[key] += counts[key]
+                self.lookup.cache_clear()
+            else:
+                self.__entries.clear()
+
+    def info(self) -> dict:
+        hits = self.hits
+        lookups = hits + self.misses
+        return {
+            'hits': hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'eviction': self.eviction,
+            'hit_rate': hits / lookups if lookups > 0 else 0.0
+        }
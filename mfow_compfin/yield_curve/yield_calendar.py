@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from typing import List
+import numpy as np
 
 
 class YieldCalendar(ABC):
@@ -17,12 +18,24 @@ class YieldCalendar(ABC):
     def get_timestamp(self, period: int) -> datetime:
         raise NotImplementedError
 
+    def get_periods(self, timestamps) -> np.ndarray:
+        # accepts anything convertible to a datetime64 array, e.g. a pandas DatetimeIndex or Series.
+        timestamps = np.asarray(timestamps, dtype='datetime64[us]').astype(datetime)
+        return np.array([self.get_period(timestamp) for timestamp in timestamps], dtype=np.int64)
+
+    def get_timestamps(self, periods) -> np.ndarray:
+        periods = np.asarray(periods)
+        return np.array([self.get_timestamp(int(period)) for period in periods], dtype='datetime64[ns]')
+
 
 class MonthlyYieldCalendar(YieldCalendar):
     def __init__(self, **kwargs):
         super(MonthlyYieldCalendar, self).__init__(**kwargs)
         assert self.start_timestamp.day == 1
 
+        # months since the numpy epoch (1970-01) of the calendar start.
+        self.__start_month = np.datetime64(self.start_timestamp, 'M').astype(np.int64)
+
     def get_timestamp(self, period: int) -> datetime:
         assert isinstance(period, int)
         assert period >= 0
@@ -36,3 +49,32 @@ class MonthlyYieldCalendar(YieldCalendar):
 
     def get_period(self, timestamp: datetime) -> int:
         return self.__get_month_index(timestamp) - self.__get_month_index(self.start_timestamp)
+
+    def get_periods(self, timestamps) -> np.ndarray:
+        months = np.asarray(timestamps, dtype='datetime64[M]').astype(np.int64)
+        return months - self.__start_month
+
+    def get_timestamps(self, periods) -> np.ndarray:
+        periods = np.asarray(periods)
+        assert np.issubdtype(periods.dtype, np.integer)
+        assert np.all(periods >= 0)
+        return (self.__start_month + periods).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def to_periods(calendar: YieldCalendar, timestamps):
+    if isinstance(timestamps, datetime):
+        return calendar.get_period(timestamps)
+    elif isinstance(timestamps, np.datetime64):
+        return int(calendar.get_periods(np.array([timestamps]))[0])
+    elif isinstance(timestamps, (int, np.integer)):
+        return timestamps
+    elif isinstance(timestamps, list):
+        # lists may mix datetimes and periods, so convert them one at a time.
+        return np.array([to_periods(calendar, timestamp) for timestamp in timestamps], dtype=np.int64)
+
+    # numpy arrays and pandas DatetimeIndex / Series
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return calendar.get_periods(timestamps)
+
+    return timestamps
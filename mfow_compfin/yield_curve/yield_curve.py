@@ -1,9 +1,16 @@
 import numpy as np
-from typing import List, Union
-from functools import lru_cache
-from .interest import interpolate_rate, discount_rate
-from .yield_calendar import YieldCalendar
+import time
+from typing import List, Union, Optional
+from .interest import interpolate_rate, interpolate_rates, interpolate_curve, discount_rate
+from .yield_calendar import YieldCalendar, MonthlyYieldCalendar, to_periods
+from .rate_cache import RateCache
 from datetime import datetime
+from mfow_compfin.persistence import save_artifact, load_artifact
+from mfow_compfin.instrumentation import instrumented, stats
+
+
+def _size_rows(result, *args, **kwargs) -> int:
+    return np.size(result)
 
 
 class YieldCurve:
@@ -29,9 +36,8 @@ class YieldCurve:
             self.allow_post_extrapolation = False
 
         assert len(self.periods.shape) == 1
-        assert len(self.rates.shape) == 1
-        assert len(self.periods) == len(self.rates)
         assert len(self.periods) >= 1
+        self.__check_rates(self.rates)
 
         for i in range(1, len(self.periods)):
             assert self.periods[i] > self.periods[i-1]
@@ -44,6 +50,87 @@ class YieldCurve:
         if self.calendar is not None:
             assert isinstance(self.calendar, YieldCalendar)
 
+        # per-instance cache of scalar rate lookups.
+        self.rate_cache = self.__rate_cache(maxsize=kwargs.get('rate_cache_size', 128),
+                                            eviction=kwargs.get('rate_cache_eviction', 'lru'))
+
+        # optional dense table of discount factors from period 0 to a horizon.
+        self.discount_grid: Optional[np.ndarray] = None
+        self.discount_grid_info: Optional[dict] = None
+        # the grid as python floats (None where nan) for scalar lookups, which then avoid numpy scalars.
+        self.__grid_factors: Optional[list] = None
+
+        discount_grid_horizon: Optional[int] = kwargs.get('discount_grid_horizon')
+        if discount_grid_horizon is not None:
+            self.build_discount_grid(discount_grid_horizon)
+
+    def __rate_cache(self, **kwargs) -> RateCache:
+        return RateCache(compute=self.__compute_rate, **kwargs)
+
+    # the rate cache holds a lock and a method of this curve, so it is not pickled (or deep copied)
+    # but rebuilt empty with the same settings.
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['rate_cache'] = {'maxsize': self.rate_cache.maxsize, 'eviction': self.rate_cache.eviction}
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.rate_cache = self.__rate_cache(**state['rate_cache'])
+
+    def __check_rates(self, rates: np.ndarray):
+        assert len(rates.shape) == 1
+        assert len(self.periods) == len(rates)
+
+    def set_rates(self, rates: Union[List[float], np.ndarray]):
+        if isinstance(rates, list):
+            rates = np.array(rates)
+
+        self.__check_rates(rates)
+        self.rates = rates
+        self.clear_cache()
+
+        if self.discount_grid_info is not None:
+            self.build_discount_grid(self.discount_grid_info['horizon'])
+
+    def clear_cache(self):
+        self.rate_cache.clear()
+
+    def cache_info(self) -> dict:
+        return self.rate_cache.info()
+
+    def build_discount_grid(self, horizon: int) -> dict:
+        assert isinstance(horizon, (int, np.integer))
+        assert horizon >= 0
+
+        start_time = time.perf_counter()
+        periods = np.arange(horizon + 1)
+
+        # periods the curve does not cover (before the first knot or after the last without extrapolation)
+        # are nan, and lookups that touch them go through get_rate, which rejects them.
+        defined = self.__defined(periods)
+        grid = np.full(len(periods), np.nan)
+        grid[defined] = discount_rate(self.__get_rates(periods[defined]), periods[defined] / self.periods_per_year)
+        build_seconds = time.perf_counter() - start_time
+
+        self.__set_discount_grid(grid, {
+            'horizon': int(horizon),
+            'build_seconds': build_seconds,
+            'nbytes': grid.nbytes
+        })
+
+        return self.discount_grid_info
+
+    def __set_discount_grid(self, grid: np.ndarray, info: dict):
+        self.discount_grid = grid
+        self.discount_grid_info = info
+        self.__grid_factors = [None if np.isnan(factor) else factor for factor in grid.tolist()]
+
+    def clear_discount_grid(self):
+        self.discount_grid = None
+        self.discount_grid_info = None
+        self.__grid_factors = None
+
     def __get_highest_prior_index(self, period: int, min: int, max: int) -> int:
         if min == max:
             return min
@@ -69,15 +156,21 @@ class YieldCurve:
 
             return self.__get_highest_prior_index(period, mid, max)
 
-    @lru_cache(maxsize=128)
     def __get_rate(self, period: int) -> float:
+        if period == 0:
+            return 0.0
+        if stats._enabled:
+            return self.rate_cache.counted_lookup(period)
+        return self.rate_cache.lookup(period)
+
+    def __compute_rate(self, period: int) -> float:
         if period < self.periods[0]:
             assert self.allow_prior_extrapolation
             return self.rates[0]
         elif period == self.periods[0]:
             return self.rates[0]
 
-        prior_index = self.__get_highest_prior_index(period, 0, len(self.periods))
+        prior_index = self.__get_highest_prior_index(period, 0, len(self.periods) - 1)
         prior_period = self.periods[prior_index]
 
         assert prior_period <= period
@@ -89,10 +182,14 @@ class YieldCurve:
 
         if prior_period == self.periods[-1]:
             assert self.allow_post_extrapolation
-            next_index = prior_index
-            prior_index = prior_index - 1
-        else:
-            next_index = prior_index + 1
+            assert len(self.periods) >= 2
+            return float(interpolate_rates(first_period=self.periods[-2] / float(self.periods_per_year),
+                                           next_period=self.periods[-1] / float(self.periods_per_year),
+                                           first_rate=self.rates[-2],
+                                           next_rate=self.rates[-1],
+                                           extrapolate_period=period / float(self.periods_per_year)))
+
+        next_index = prior_index + 1
 
         return interpolate_rate(first_period=self.periods[prior_index] / float(self.periods_per_year),
                                 next_period=self.periods[next_index] / float(self.periods_per_year),
@@ -100,26 +197,85 @@ class YieldCurve:
                                 next_rate=self.rates[next_index],
                                 extrapolate_period=period / float(self.periods_per_year))
 
-    def get_rate(self, period):
-        if period == 0:
-            return 0.0
+    def __get_rates(self, period: np.ndarray) -> np.ndarray:
+        return interpolate_curve(periods=self.periods,
+                                 rates=self.rates,
+                                 period=period,
+                                 periods_per_year=self.periods_per_year,
+                                 allow_prior_extrapolation=self.allow_prior_extrapolation,
+                                 allow_post_extrapolation=self.allow_post_extrapolation,
+                                 allow_extrapolation=self.allow_extrapolation)
 
-        if isinstance(period, int):
-            return self.__get_rate(period)
+    def get_rate(self, period):
+        # instrumented inline rather than decorated, as a wrapper would cost more than a cached scalar lookup.
+        if stats._enabled:
+            return stats.call_timed('yield_curve.get_rate', _size_rows, self.__rate, (period,), dict())
+        return self.__rate(period)
+
+    def __rate(self, period):
+        if isinstance(period, (int, np.integer)):
+            return self.__get_rate(int(period))
         elif isinstance(period, list):
             return list(map(self.__get_rate, period))
         elif isinstance(period, np.ndarray):
-            assert period.dtype == np.int
+            assert np.issubdtype(period.dtype, np.integer)
             assert len(period.shape) == 1
-            return np.array(list(map(self.__get_rate, period)))
+            return self.__get_rates(period)
+
+    def __defined(self, period: np.ndarray) -> np.ndarray:
+        # periods with a rate on this curve, as get_rate would accept them.
+        prior = period < self.periods[0]
+        post = period > self.periods[-1]
+        on_knot = np.isin(period, self.periods)
+
+        return (period == 0) | on_knot | (prior & bool(self.allow_prior_extrapolation)) | \
+            (~prior & ~post & bool(self.allow_extrapolation)) | \
+            (post & bool(self.allow_extrapolation) & bool(self.allow_post_extrapolation))
+
+    def __grid_factor(self, period: int) -> Optional[float]:
+        # the tabulated discount factor of period, None when the grid does not cover it.
+        if self.__grid_factors is not None and 0 <= period < len(self.__grid_factors):
+            return self.__grid_factors[period]
+        return None
+
+    def __discount_factors(self, period: np.ndarray) -> np.ndarray:
+        if period.size == 0:
+            return np.zeros(period.shape)
+
+        first_period = np.min(period)
+        last_period = np.max(period)
+
+        if self.__grid_factor(int(first_period)) is not None and self.__grid_factor(int(last_period)) is not None:
+            factors = self.discount_grid[period]
+            if not np.any(np.isnan(factors)):
+                return factors
+
+        if self.allow_extrapolation and last_period - first_period < period.size \
+                and np.all(self.__defined(np.arange(first_period, last_period + 1))):
+            # fewer distinct periods than lookups, so tabulate the covered range once and gather from it.
+            span = np.arange(first_period, last_period + 1)
+            table = discount_rate(self.__get_rates(span), span / self.periods_per_year)
+            return table[period - first_period]
+
+        return discount_rate(self.__get_rates(period), period / self.periods_per_year)
 
     def __discount_periods(self, start_period: int, end_period: int):
-        start_discount = discount_rate(self.get_rate(start_period), start_period / self.periods_per_year)
-        end_discount = discount_rate(self.get_rate(end_period), end_period / self.periods_per_year)
+        start_discount = self.__grid_factor(start_period)
+        end_discount = self.__grid_factor(end_period)
+
+        if start_discount is None or end_discount is None:
+            start_discount = discount_rate(self.__get_rate(start_period), start_period / self.periods_per_year)
+            end_discount = discount_rate(self.__get_rate(end_period), end_period / self.periods_per_year)
         assert start_discount > end_discount
         return end_discount / start_discount
 
     def discount(self, *args):
+        # instrumented inline as get_rate. the curve itself calls __discount, so nested calls are not timed twice.
+        if stats._enabled:
+            return stats.call_timed('yield_curve.discount', _size_rows, self.__discount, args, dict())
+        return self.__discount(*args)
+
+    def __discount(self, *args):
         if len(args) == 1:
             start = 0
             end = args[0]
@@ -129,34 +285,142 @@ class YieldCurve:
         else:
             raise RuntimeError('Unknown argument combination.')
 
-        if isinstance(start, datetime):
-            start = self.calendar.get_period(start)
+        start = to_periods(self.calendar, start)
+        end = to_periods(self.calendar, end)
 
-        if isinstance(end, datetime):
-            end = self.calendar.get_period(end)
+        if isinstance(start, (int, np.integer)) and isinstance(end, (int, np.integer)):
+            if start == end:
+                return 1.0
 
-        if start == end:
-            return 1.0
+            return self.__discount_periods(int(start), int(end))
 
-        if isinstance(start, int) and isinstance(end, int):
-            return self.__discount_periods(start, end)
+        start = np.asarray(start)
+        end = np.asarray(end)
+
+        if np.issubdtype(start.dtype, np.integer) and np.issubdtype(end.dtype, np.integer):
+            return self.__discount_factors(end) / self.__discount_factors(start)
         else:
             raise RuntimeError('Unsupported combination of start and end types.')
 
-    def __single_cashflow_npv(self, cashflow: float, timestamp: Union[int, datetime]) -> float:
-        discount = self.discount(timestamp)
-        return cashflow * discount
-
+    @instrumented('yield_curve.npv', rows=lambda result, self, **kwargs: len(kwargs.get('cashflows')))
     def npv(self, **kwargs) -> float:
         cashflows: List[float] = kwargs.get('cashflows')
         timestamps: List[Union[datetime, int]] = kwargs.get('timestamps')
         assert len(cashflows) == len(timestamps)
 
         # the time at which the value is measured
-        clock: Union[datetime, int] = kwargs.get('clock', 0)
+        clock: Union[datetime, np.datetime64, int] = kwargs.get('clock', 0)
+
+        periods = np.asarray(to_periods(self.calendar, timestamps))
+        cashflow_values = np.sum(np.asarray(cashflows, dtype=float) * self.__discount_factors(periods))
 
-        cashflow_values = np.sum(list(map(lambda x: self.__single_cashflow_npv(x[0], x[1]),
-                                          zip(cashflows, timestamps))))
+        discount = self.__discount(clock)
+        return cashflow_values / discount
+
+    @instrumented('yield_curve.npv_batch', rows=lambda result, *args, **kwargs: np.size(result))
+    def npv_batch(self, **kwargs) -> np.ndarray:
+        # either a dense (instruments x periods) matrix of cashflows,
+        # or flat cashflows and periods with per-instrument offsets (CSR layout).
+        cashflows: np.ndarray = np.asarray(kwargs.get('cashflows'), dtype=float)
+        timestamps: Optional[np.ndarray] = kwargs.get('timestamps')
+        offsets: Optional[np.ndarray] = kwargs.get('offsets')
+
+        if offsets is None:
+            assert len(cashflows.shape) == 2
+            num_instruments = cashflows.shape[0]
+
+            if timestamps is None:
+                timestamps = np.arange(cashflows.shape[1])
+
+            timestamps = np.asarray(to_periods(self.calendar, timestamps))
+            assert np.issubdtype(timestamps.dtype, np.integer)
+
+            if len(timestamps.shape) == 1:
+                # the same period grid for every instrument
+                assert timestamps.shape[0] == cashflows.shape[1]
+                cashflow_values = cashflows @ self.__discount_factors(timestamps)
+            else:
+                assert timestamps.shape == cashflows.shape
+                cashflow_values = np.einsum('ij,ij->i', cashflows, self.__discount_factors(timestamps))
+        else:
+            offsets = np.asarray(offsets)
+            timestamps = np.asarray(to_periods(self.calendar, timestamps))
+
+            assert len(cashflows.shape) == 1
+            assert timestamps.shape == cashflows.shape
+            assert np.issubdtype(timestamps.dtype, np.integer)
+            assert len(offsets.shape) == 1
+            assert offsets[0] == 0
+            assert offsets[-1] == len(cashflows)
+
+            counts = np.diff(offsets)
+            assert np.all(counts >= 0)
+
+            num_instruments = len(counts)
+            instrument = np.repeat(np.arange(num_instruments), counts)
+            cashflow_values = np.bincount(instrument,
+                                          weights=cashflows * self.__discount_factors(timestamps),
+                                          minlength=num_instruments)
+
+        # the time at which each value is measured, shared or per instrument
+        clock: Union[int, datetime, np.ndarray] = to_periods(self.calendar, kwargs.get('clock', 0))
+
+        if isinstance(clock, np.ndarray):
+            assert clock.shape == (num_instruments,)
+            assert np.issubdtype(clock.dtype, np.integer)
+            discount = self.__discount_factors(clock)
+        else:
+            discount = self.__discount(clock)
 
-        discount = self.discount(clock)
         return cashflow_values / discount
+
+    def save(self, path: str):
+        meta = {
+            'periods_per_year': self.periods_per_year,
+            'allow_prior_extrapolation': self.allow_prior_extrapolation,
+            'allow_post_extrapolation': self.allow_post_extrapolation,
+            'allow_extrapolation': self.allow_extrapolation,
+            'rate_cache_size': self.rate_cache.maxsize,
+            'rate_cache_eviction': self.rate_cache.eviction,
+            'discount_grid_info': self.discount_grid_info
+        }
+
+        if self.calendar is None:
+            meta['calendar'] = None
+        elif isinstance(self.calendar, MonthlyYieldCalendar):
+            meta['calendar'] = {'type': 'monthly', 'start_timestamp': self.calendar.start_timestamp.isoformat()}
+        else:
+            raise RuntimeError('Unsupported calendar type.')
+
+        arrays = {'periods': self.periods, 'rates': self.rates}
+        if self.discount_grid is not None:
+            arrays['discount_grid'] = self.discount_grid
+
+        save_artifact(path, kind='YieldCurve', meta=meta, arrays=arrays)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'YieldCurve':
+        artifact = load_artifact(path, kind='YieldCurve', mmap=mmap)
+        meta = artifact['meta']
+        arrays = artifact['arrays']
+
+        calendar = None
+        if meta['calendar'] is not None:
+            assert meta['calendar']['type'] == 'monthly'
+            calendar = MonthlyYieldCalendar(start_timestamp=datetime.fromisoformat(meta['calendar']['start_timestamp']))
+
+        curve = YieldCurve(periods=arrays['periods'],
+                           rates=arrays['rates'],
+                           periods_per_year=meta['periods_per_year'],
+                           allow_prior_extrapolation=meta['allow_prior_extrapolation'],
+                           allow_post_extrapolation=meta['allow_post_extrapolation'],
+                           allow_extrapolation=meta['allow_extrapolation'],
+                           rate_cache_size=meta['rate_cache_size'],
+                           rate_cache_eviction=meta['rate_cache_eviction'],
+                           calendar=calendar)
+
+        # the saved grid is used as is rather than rebuilt.
+        if 'discount_grid' in arrays:
+            curve.__set_discount_grid(arrays['discount_grid'], meta['discount_grid_info'])
+
+        return curve
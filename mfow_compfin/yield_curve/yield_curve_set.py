@@ -0,0 +1,178 @@
+import numpy as np
+from typing import Optional, Union
+from .interest import interpolate_curve, discount_rate
+from .yield_calendar import YieldCalendar, to_periods
+from .yield_curve import YieldCurve
+
+
+def parallel_shifts(**kwargs) -> np.ndarray:
+    # one scenario per shift, moving every knot by the same amount.
+    shifts: np.ndarray = np.asarray(kwargs.get('shifts'), dtype=float)
+    num_knots: int = kwargs.get('num_knots')
+
+    assert len(shifts.shape) == 1
+    return np.repeat(shifts[:, np.newaxis], num_knots, axis=1)
+
+
+def twist_shifts(**kwargs) -> np.ndarray:
+    # one scenario per (short, long) pair, moving the first knot by the short shift,
+    # the last knot by the long shift, and the knots in between linearly in period.
+    periods: np.ndarray = np.asarray(kwargs.get('periods'), dtype=float)
+    short_shifts: np.ndarray = np.asarray(kwargs.get('short_shifts'), dtype=float)
+    long_shifts: np.ndarray = np.asarray(kwargs.get('long_shifts'), dtype=float)
+
+    assert len(periods.shape) == 1
+    assert short_shifts.shape == long_shifts.shape
+    assert len(short_shifts.shape) == 1
+
+    if len(periods) == 1:
+        weight = np.zeros(1)
+    else:
+        weight = (periods - periods[0]) / (periods[-1] - periods[0])
+
+    return short_shifts[:, np.newaxis] * (1.0 - weight) + long_shifts[:, np.newaxis] * weight
+
+
+def key_rate_shifts(**kwargs) -> np.ndarray:
+    # one scenario per knot, bumping only that knot.
+    num_knots: int = kwargs.get('num_knots')
+    bump: float = kwargs.get('bump', 0.0001)
+    return np.eye(num_knots) * bump
+
+
+class YieldCurveSet:
+    def __init__(self, **kwargs):
+        curve: Optional[YieldCurve] = kwargs.get('curve')
+
+        if curve is not None:
+            # scenarios defined as shifts of a base curve
+            assert isinstance(curve, YieldCurve)
+            shifts: np.ndarray = np.asarray(kwargs.get('shifts', np.zeros((1, len(curve.periods)))), dtype=float)
+            if len(shifts.shape) == 1:
+                shifts = parallel_shifts(shifts=shifts, num_knots=len(curve.periods))
+
+            self.periods: np.ndarray = curve.periods
+            self.rates: np.ndarray = curve.rates[np.newaxis, :] + shifts
+            self.periods_per_year: int = curve.periods_per_year
+            self.allow_prior_extrapolation: bool = curve.allow_prior_extrapolation
+            self.allow_post_extrapolation: bool = curve.allow_post_extrapolation
+            self.allow_extrapolation: bool = curve.allow_extrapolation
+            self.calendar: YieldCalendar = kwargs.get('calendar', curve.calendar)
+        else:
+            self.periods: np.ndarray = np.asarray(kwargs.get('periods'))
+            self.rates: np.ndarray = np.asarray(kwargs.get('rates'), dtype=float)
+            self.periods_per_year: int = kwargs.get('periods_per_year')
+            self.allow_prior_extrapolation: bool = kwargs.get('allow_prior_extrapolation')
+            self.allow_post_extrapolation: bool = kwargs.get('allow_post_extrapolation')
+            self.allow_extrapolation: bool = kwargs.get('allow_extrapolation', True)
+            self.calendar: YieldCalendar = kwargs.get('calendar')
+
+            if not self.allow_extrapolation:
+                assert self.allow_prior_extrapolation is not True
+                assert self.allow_post_extrapolation is not True
+                self.allow_prior_extrapolation = False
+                self.allow_post_extrapolation = False
+
+        assert len(self.periods.shape) == 1
+        assert len(self.rates.shape) == 2
+        assert self.rates.shape[1] == len(self.periods)
+        assert len(self.periods) >= 1
+        assert np.all(np.diff(self.periods) > 0)
+
+        if self.calendar is not None:
+            assert isinstance(self.calendar, YieldCalendar)
+
+    def __len__(self) -> int:
+        return self.rates.shape[0]
+
+    def get_curve(self, scenario: int) -> YieldCurve:
+        return YieldCurve(periods=self.periods,
+                          rates=self.rates[scenario],
+                          periods_per_year=self.periods_per_year,
+                          allow_prior_extrapolation=self.allow_prior_extrapolation,
+                          allow_post_extrapolation=self.allow_post_extrapolation,
+                          allow_extrapolation=self.allow_extrapolation,
+                          calendar=self.calendar)
+
+    def __get_rates(self, rates: np.ndarray, period: np.ndarray) -> np.ndarray:
+        return interpolate_curve(periods=self.periods,
+                                 rates=rates,
+                                 period=period,
+                                 periods_per_year=self.periods_per_year,
+                                 allow_prior_extrapolation=self.allow_prior_extrapolation,
+                                 allow_post_extrapolation=self.allow_post_extrapolation,
+                                 allow_extrapolation=self.allow_extrapolation)
+
+    def __discount_factors(self, rates: np.ndarray, period: np.ndarray) -> np.ndarray:
+        return discount_rate(self.__get_rates(rates, period), period / self.periods_per_year)
+
+    def get_rates(self, period) -> np.ndarray:
+        # (scenarios x periods)
+        period = np.asarray(to_periods(self.calendar, period))
+        assert np.issubdtype(period.dtype, np.integer)
+        return self.__get_rates(self.rates, period)
+
+    def discount(self, period) -> np.ndarray:
+        # (scenarios x periods) discount factors from period 0
+        period = np.asarray(to_periods(self.calendar, period))
+        assert np.issubdtype(period.dtype, np.integer)
+        return self.__discount_factors(self.rates, period)
+
+    def __npv(self, rates: np.ndarray, cashflows: np.ndarray, timestamps: np.ndarray,
+              clock: Union[int, np.ndarray]) -> np.ndarray:
+        discount = self.__discount_factors(rates, timestamps)
+        cashflow_values = discount @ cashflows.T
+        clock = np.atleast_1d(clock)
+
+        # values measured at period 0 are not discounted.
+        if np.all(clock == 0):
+            clock_discount = np.ones((rates.shape[0], len(clock)))
+        else:
+            clock_discount = self.__discount_factors(rates, clock)
+
+        if cashflow_values.ndim == 1:
+            return cashflow_values / clock_discount[:, 0]
+
+        return cashflow_values / clock_discount
+
+    def __npv_arguments(self, **kwargs):
+        cashflows: np.ndarray = np.asarray(kwargs.get('cashflows'), dtype=float)
+        assert len(cashflows.shape) in [1, 2]
+
+        timestamps = kwargs.get('timestamps')
+        if timestamps is None:
+            timestamps = np.arange(cashflows.shape[-1])
+
+        timestamps = np.asarray(to_periods(self.calendar, timestamps))
+        assert np.issubdtype(timestamps.dtype, np.integer)
+        assert timestamps.shape == (cashflows.shape[-1],)
+
+        # the time at which the value is measured, shared or per instrument
+        clock = np.asarray(to_periods(self.calendar, kwargs.get('clock', 0)))
+        assert np.issubdtype(clock.dtype, np.integer)
+        if clock.ndim == 1:
+            assert len(cashflows.shape) == 2
+            assert clock.shape == (cashflows.shape[0],)
+
+        return cashflows, timestamps, clock
+
+    def npv(self, **kwargs) -> np.ndarray:
+        # cashflows over `timestamps` for one instrument (T,) or many (N x T).
+        # returns (S,) or (S x N) values, one row per scenario.
+        cashflows, timestamps, clock = self.__npv_arguments(**kwargs)
+        return self.__npv(self.rates, cashflows, timestamps, clock)
+
+    def key_rate_dv01(self, **kwargs) -> np.ndarray:
+        # value lost in every scenario when each knot rate alone rises by `bump`.
+        # returns (S x K) for one instrument or (S x N x K) for many.
+        cashflows, timestamps, clock = self.__npv_arguments(**kwargs)
+        bump: float = kwargs.get('bump', 0.0001)
+
+        num_scenarios, num_knots = self.rates.shape
+        bumped_rates = self.rates[:, np.newaxis, :] + key_rate_shifts(num_knots=num_knots, bump=bump)
+
+        base = self.__npv(self.rates, cashflows, timestamps, clock)
+        bumped = self.__npv(bumped_rates.reshape(num_scenarios * num_knots, num_knots), cashflows, timestamps, clock)
+        bumped = bumped.reshape((num_scenarios, num_knots) + base.shape[1:])
+
+        return base[..., np.newaxis] - np.moveaxis(bumped, 1, -1)